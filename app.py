@@ -1,95 +1,159 @@
+import atexit
+import base64
+import copy
 import csv
+import functools
+import hashlib
 import io
+import itertools
+import operator
 import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import traceback
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import click
 import psycopg2
-import base64
+from psycopg2 import pool
+import psycopg2.errors
+import psycopg2.extras
+from psycopg2 import sql
+import hmac
 from datetime import datetime, date
 from io import BytesIO
 
 from flask import (
-    Flask, Response, flash, jsonify, redirect, render_template,
-    request, send_file, session, url_for
+    Flask, Response, abort, flash, get_flashed_messages, jsonify, make_response,
+    redirect, render_template, request, send_file, session, stream_with_context,
+    url_for
 )
 
+from cachetools import TTLCache
+from itsdangerous import BadSignature, URLSafeSerializer
+from werkzeug.http import parse_options_header
+from werkzeug.security import check_password_hash, generate_password_hash
+
 import qrcode
+import numpy as np
 import pandas as pd
 
 # Optional PDF library
 try:
     from reportlab.lib import colors
     from reportlab.lib.pagesizes import letter, landscape, A4
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.platypus import PageBreak, SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
     from reportlab.lib.styles import getSampleStyleSheet
     REPORTLAB_AVAILABLE = True
 except ImportError:
     REPORTLAB_AVAILABLE = False
 
+# Optional Excel writer; streams rows to disk instead of holding every cell
+try:
+    import xlsxwriter
+    XLSXWRITER_AVAILABLE = True
+except ImportError:
+    XLSXWRITER_AVAILABLE = False
+
+# Optional columnar formats for analytics exports
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Under gevent workers, let psycopg2 yield to other greenlets while it waits
+# on the database instead of blocking the whole worker
+GEVENT_ACTIVE = False
+try:
+    from gevent import monkey
+    if monkey.is_module_patched('socket'):
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+        GEVENT_ACTIVE = True
+        print("✅ psycopg2 patched for gevent")
+except ImportError:
+    pass
+
+def run_blocking(func, *args):
+    """Call a CPU-bound function without stalling the worker's other greenlets.
+
+    Under gevent the call runs on the hub's OS thread pool; hashlib releases
+    the GIL while it works, so other requests keep being served.
+    """
+    if GEVENT_ACTIVE:
+        import gevent
+        return gevent.get_hub().threadpool.apply(func, args)
+    return func(*args)
+
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'your_secret_key_here')
-app.config['UPLOAD_FOLDER'] = 'static/qrcodes'
 
-if not os.path.exists(app.config['UPLOAD_FOLDER']):
-    os.makedirs(app.config['UPLOAD_FOLDER'])
+# Registration QR codes carry a signed registration id
+qr_serializer = URLSafeSerializer(app.secret_key, salt='registration-qr')
 
 # -----------------------
 # Jinja2 Filters for Date Handling
 # -----------------------
 
+@functools.lru_cache(maxsize=4096)
+def parse_date_string(value):
+    """Parse a 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS' string, or None.
+
+    fromisoformat is implemented in C, unlike strptime, and lists render the
+    same few dates over and over, so results are memoized.
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+def format_date_string(value, format_str, default):
+    """Slow path for the date filters: format a date string, else default"""
+    if isinstance(value, str):
+        parsed = parse_date_string(value)
+        if parsed is not None:
+            return parsed.strftime(format_str)
+    return default
+
+# Templates pass the date/datetime objects psycopg2 returns, so each filter
+# tries strftime first and only falls back for strings and NULLs
 @app.template_filter('format_date')
 def format_date_filter(value, format_str='%Y-%m-%d'):
     """Format a date in Jinja2 templates"""
-    if isinstance(value, (date, datetime)):
+    try:
         return value.strftime(format_str)
-    elif isinstance(value, str):
-        try:
-            date_obj = datetime.strptime(value, '%Y-%m-%d')
-            return date_obj.strftime(format_str)
-        except:
-            return value
-    return str(value)
+    except AttributeError:
+        return format_date_string(value, format_str, '' if value is None else str(value))
 
 @app.template_filter('format_datetime')
 def format_datetime_filter(value, format_str='%Y-%m-%d %H:%M:%S'):
     """Format a datetime in Jinja2 templates"""
-    if isinstance(value, (datetime, date)):
+    try:
         return value.strftime(format_str)
-    elif isinstance(value, str):
-        try:
-            if ' ' in value:
-                dt_obj = datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
-            else:
-                dt_obj = datetime.strptime(value, '%Y-%m-%d')
-            return dt_obj.strftime(format_str)
-        except:
-            return value
-    return str(value)
+    except AttributeError:
+        return format_date_string(value, format_str, '' if value is None else str(value))
 
 @app.template_filter('get_day')
 def get_day_filter(value):
     """Get day from date"""
-    if isinstance(value, (date, datetime)):
+    try:
         return value.strftime('%d')
-    elif isinstance(value, str):
-        try:
-            date_obj = datetime.strptime(value, '%Y-%m-%d').date()
-            return date_obj.strftime('%d')
-        except:
-            return '??'
-    return '??'
+    except AttributeError:
+        return format_date_string(value, '%d', '??')
 
 @app.template_filter('get_month_year')
 def get_month_year_filter(value):
     """Get month/year from date"""
-    if isinstance(value, (date, datetime)):
+    try:
         return value.strftime('%m/%Y')
-    elif isinstance(value, str):
-        try:
-            date_obj = datetime.strptime(value, '%Y-%m-%d').date()
-            return date_obj.strftime('%m/%Y')
-        except:
-            return '??/????'
-    return '??/????'
+    except AttributeError:
+        return format_date_string(value, '%m/%Y', '??/????')
 
 # Add datetime to Jinja2 context
 @app.context_processor
@@ -99,8 +163,20 @@ def inject_datetime():
 # -----------------------
 # Database Configuration
 # -----------------------
-def get_db_connection():
-    """Get PostgreSQL database connection from Render"""
+# Keep workers x max connections under the database's connection limit
+DB_POOL_MIN_CONN = int(os.environ.get('PG_POOL_MIN', 5))
+DB_POOL_MAX_CONN = int(os.environ.get('PG_POOL_MAX', 20))
+# Pooled connections idle longer than this are pinged before being handed out
+DB_POOL_PING_AFTER = 300
+# Seconds a request waits for a free pooled connection before giving up
+DB_POOL_WAIT_TIMEOUT = 10
+
+_db_pool = None
+_db_pool_pid = None
+_db_pool_lock = threading.Lock()
+
+def get_database_url():
+    """Return DATABASE_URL rewritten for psycopg2, or None if not set"""
     database_url = os.environ.get('DATABASE_URL')
     
     if not database_url:
@@ -109,6 +185,13 @@ def get_db_connection():
     
     if database_url.startswith("postgres://"):
         database_url = database_url.replace("postgres://", "postgresql://", 1)
+    return database_url
+
+def get_db_connection():
+    """Get PostgreSQL database connection from Render"""
+    database_url = get_database_url()
+    if not database_url:
+        return None
     
     try:
         conn = psycopg2.connect(database_url, sslmode='require')
@@ -118,48 +201,509 @@ def get_db_connection():
         print(f"❌ Error connecting to PostgreSQL: {e}")
         return None
 
-def execute_query(query, params=(), fetch=False, fetchall=False):
-    """Execute query with proper error handling"""
-    conn = get_db_connection()
-    if conn is None:
+class PooledConnection(psycopg2.extensions.connection):
+    """Connection that remembers its PREPAREd statements and last use.
+
+    The state lives and dies with the connection itself, so a connection the
+    pool closes can never hand it on to a new one.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        self.last_used = None
+
+class BlockingConnectionPool(pool.ThreadedConnectionPool):
+    """ThreadedConnectionPool that waits for a free connection instead of raising.
+
+    A gevent worker runs more concurrent requests than the pool holds
+    connections, so callers queue here rather than failing with PoolError.
+    """
+
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        self._slots = threading.BoundedSemaphore(maxconn)
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None):
+        if not self._slots.acquire(timeout=DB_POOL_WAIT_TIMEOUT):
+            raise pool.PoolError("timed out waiting for a database connection")
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self._slots.release()
+
+def get_db_pool():
+    """Get the process-wide connection pool, creating it on first use.
+
+    The pool is keyed to the current PID so that Gunicorn workers forked
+    from a preloaded master never share sockets with their parent.
+    """
+    global _db_pool, _db_pool_pid
+    
+    if _db_pool is not None and _db_pool_pid == os.getpid():
+        return _db_pool
+    
+    with _db_pool_lock:
+        if _db_pool is None or _db_pool_pid != os.getpid():
+            database_url = get_database_url()
+            if not database_url:
+                return None
+            try:
+                _db_pool = BlockingConnectionPool(
+                    DB_POOL_MIN_CONN, DB_POOL_MAX_CONN,
+                    dsn=database_url, sslmode='require',
+                    connection_factory=PooledConnection
+                )
+                _db_pool_pid = os.getpid()
+                print("✅ PostgreSQL connection pool ready")
+            except Exception as e:
+                print(f"❌ Error creating PostgreSQL connection pool: {e}")
+                return None
+    return _db_pool
+
+@atexit.register
+def close_db_pool():
+    """Close this process's pooled connections on shutdown"""
+    if _db_pool is not None and _db_pool_pid == os.getpid():
+        _db_pool.closeall()
+
+def checkout_connection(db_pool):
+    """Take a connection from the pool, replacing it if it has gone stale"""
+    conn = db_pool.getconn()
+    last_used = conn.last_used
+    if not conn.closed and (last_used is None or time.monotonic() - last_used < DB_POOL_PING_AFTER):
+        return conn
+    
+    try:
+        if conn.closed:
+            raise psycopg2.InterfaceError("connection already closed")
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        conn.rollback()
+        return conn
+    except psycopg2.Error:
+        db_pool.putconn(conn, close=True)
+        return db_pool.getconn()
+
+def release_connection(db_pool, conn):
+    """Return a connection to the pool, discarding it if it is broken"""
+    if conn.closed:
+        db_pool.putconn(conn, close=True)
+    else:
+        conn.last_used = time.monotonic()
+        if conn.autocommit:
+            conn.autocommit = False
+        db_pool.putconn(conn)
+
+def prepare_statement(conn, name, query):
+    """PREPARE query as name on conn unless it already is"""
+    if name not in conn.prepared:
+        with conn.cursor() as cursor:
+            cursor.execute(f"PREPARE {name} AS {query}")
+        conn.prepared.add(name)
+
+@functools.lru_cache(maxsize=512)
+def is_read_only(query):
+    """True for plain SELECTs, which need no transaction around them"""
+    return query.lstrip()[:6].upper() == 'SELECT'
+
+def execute_query(query, params=(), fetch=False, fetchall=False, prepare=None, read_only=None):
+    """Execute query with proper error handling.
+
+    Reads run in autocommit mode, skipping the BEGIN/COMMIT round trips.
+    read_only defaults to fetching a plain SELECT; pass it to override.
+    """
+    if read_only is None:
+        read_only = (fetch or fetchall) and is_read_only(query)
+    
+    db_pool = get_db_pool()
+    if db_pool is None:
         print("❌ Database connection failed")
         return None
     
+    conn = None
     try:
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        
-        if fetch:
-            result = cursor.fetchone()
-            if result:
-                columns = [desc[0] for desc in cursor.description]
-                result = dict(zip(columns, result))
-        elif fetchall:
-            results = cursor.fetchall()
-            columns = [desc[0] for desc in cursor.description]
-            result = [dict(zip(columns, row)) for row in results]
-        else:
-            result = None
-        
-        conn.commit()
-        return result
+        conn = checkout_connection(db_pool)
+        conn.autocommit = read_only
+        # Commits on success and rolls back on error; autocommit reads skip both
+        with conn:
+            if prepare:
+                prepare_statement(conn, *prepare)
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                try:
+                    cursor.execute(query, params)
+                except psycopg2.errors.InvalidSqlStatementName:
+                    if not prepare:
+                        raise
+                    # The server lost the statement; PREPARE it again and
+                    # retry once. EXECUTE was the transaction's first
+                    # statement, so rolling back discards nothing.
+                    conn.rollback()
+                    conn.prepared.discard(prepare[0])
+                    prepare_statement(conn, *prepare)
+                    cursor.execute(query, params)
+                if fetch:
+                    return cursor.fetchone()
+                if fetchall:
+                    return cursor.fetchall()
+                return None
         
     except Exception as e:
         print(f"❌ Database query error: {e}")
         print(f"Query: {query}")
         print(f"Params: {params}")
-        if conn:
-            conn.rollback()
         return None
     finally:
         if conn:
-            conn.close()
+            release_connection(db_pool, conn)
+
+@functools.lru_cache(maxsize=512)
+def execute_statement(name, param_count):
+    """EXECUTE text for a prepared statement, built once per name and arity"""
+    if not param_count:
+        return f"EXECUTE {name}"
+    return f"EXECUTE {name} ({', '.join(['%s'] * param_count)})"
+
+def execute_prepared(name, query, params=(), fetch=False, fetchall=False):
+    """Run a hot query as a server-side prepared statement.
+
+    query uses $1, $2... placeholders and is PREPAREd once per pooled
+    connection, so repeat calls skip parsing and planning. Needs session-level
+    connections; PgBouncer in transaction mode would lose the statements.
+    """
+    return execute_query(execute_statement(name, len(params)), params,
+                         fetch=fetch, fetchall=fetchall,
+                         prepare=(name, query),
+                         read_only=(fetch or fetchall) and is_read_only(query))
+
+def execute_query_iter(query, params=(), batch_size=1000):
+    """Yield rows from a server-side cursor, fetching batch_size at a time.
+
+    The pooled connection is held until the generator is exhausted or closed,
+    so large result sets never sit in memory all at once. Errors are logged
+    and re-raised: a streaming export must abort rather than end early and
+    pass a truncated file off as complete.
+    """
+    db_pool = get_db_pool()
+    if db_pool is None:
+        print("❌ Database connection failed")
+        return
+    
+    conn = None
+    try:
+        conn = checkout_connection(db_pool)
+        with conn:
+            with conn.cursor(name='stream', cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                cursor.itersize = batch_size
+                cursor.execute(query, params)
+                yield from cursor
+    except Exception as e:
+        print(f"❌ Database query error: {e}")
+        print(f"Query: {query}")
+        print(f"Params: {params}")
+        raise
+    finally:
+        if conn:
+            release_connection(db_pool, conn)
+
+# CSV from COPY stays in memory up to this size before spilling to disk
+COPY_SPOOL_SIZE = 1024 * 1024
+
+def copy_query_csv(query, params=(), header=True):
+    """Run a SELECT through COPY ... TO STDOUT as CSV.
+
+    Postgres writes the CSV itself, so no rows are parsed in Python. Returns
+    (file, row_count) with the file rewound, or (None, 0) on error.
+    """
+    db_pool = get_db_pool()
+    if db_pool is None:
+        print("❌ Database connection failed")
+        return None, 0
+
+    conn = None
+    output = tempfile.SpooledTemporaryFile(max_size=COPY_SPOOL_SIZE)
+    try:
+        conn = checkout_connection(db_pool)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            options = "FORMAT csv, HEADER" if header else "FORMAT csv"
+            copy = f"COPY ({cursor.mogrify(query, params).decode()}) TO STDOUT WITH ({options})"
+            cursor.copy_expert(copy, output)
+            output.seek(0)
+            return output, cursor.rowcount
+    except Exception as e:
+        print(f"❌ Database query error: {e}")
+        print(f"Query: {query}")
+        print(f"Params: {params}")
+        output.close()
+        return None, 0
+    finally:
+        if conn:
+            release_connection(db_pool, conn)
+
+BULK_COPY_THRESHOLD = 100
+
+def bulk_insert(table, columns, rows, on_conflict=None, cursor=None):
+    """Insert many rows in a single round trip.
+
+    Batches up to BULK_COPY_THRESHOLD rows use a multi-row INSERT via
+    execute_values; larger ones stream through COPY. COPY cannot skip
+    conflicts, so an on_conflict clause always takes the INSERT path.
+    Pass a cursor to join an open transaction, otherwise a pooled
+    connection is used and committed. Returns the number of rows sent.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    
+    if cursor is None:
+        db_pool = get_db_pool()
+        if db_pool is None:
+            print("❌ Database connection failed")
+            return 0
+        conn = checkout_connection(db_pool)
+        try:
+            with conn, conn.cursor() as cursor:
+                return bulk_insert(table, columns, rows, on_conflict, cursor)
+        except Exception as e:
+            print(f"❌ Bulk insert into {table} failed: {e}")
+            return 0
+        finally:
+            release_connection(db_pool, conn)
+    
+    target = sql.SQL("{} ({})").format(
+        sql.Identifier(table),
+        sql.SQL(', ').join(map(sql.Identifier, columns))
+    )
+    
+    if on_conflict or len(rows) <= BULK_COPY_THRESHOLD:
+        query = sql.SQL("INSERT INTO {} VALUES %s").format(target)
+        if on_conflict:
+            query = sql.SQL("{} ON CONFLICT {}").format(query, sql.SQL(on_conflict))
+        psycopg2.extras.execute_values(cursor, query.as_string(cursor), rows, page_size=500)
+    else:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(['\\N' if value is None else value for value in row])
+        buffer.seek(0)
+        copy = sql.SQL("COPY {} FROM STDIN WITH (FORMAT csv, NULL '\\N')").format(target)
+        cursor.copy_expert(copy.as_string(cursor), buffer)
+    return len(rows)
+
+# -----------------------
+# Password Hashing
+# -----------------------
+PASSWORD_HASH_PREFIXES = ('pbkdf2:', 'scrypt:')
+
+def verify_password(table, account, password):
+    """Check a login password against the stored hash.
+
+    Rows created before passwords were hashed still hold plaintext; those are
+    compared in constant time and upgraded to a hash on successful login.
+    """
+    stored = account['password'] or ''
+    if stored.startswith(PASSWORD_HASH_PREFIXES):
+        return run_blocking(check_password_hash, stored, password)
+    
+    if not hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8')):
+        return False
+    
+    execute_query(
+        f"UPDATE {table} SET password = %s WHERE id = %s",
+        (run_blocking(generate_password_hash, password), account['id'])
+    )
+    return True
 
 # -----------------------
 # Database Initialization
 # -----------------------
+# Bump SCHEMA_VERSION whenever SCHEMA_SQL changes so deployed databases re-apply it
+SCHEMA_VERSION = 9
+
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS students (
+        id SERIAL PRIMARY KEY,
+        student_id VARCHAR(50) UNIQUE NOT NULL,
+        name VARCHAR(100) NOT NULL,
+        email VARCHAR(100) UNIQUE NOT NULL,
+        password VARCHAR(255) NOT NULL,
+        department VARCHAR(100),
+        year VARCHAR(10),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    
+    CREATE TABLE IF NOT EXISTS events (
+        id SERIAL PRIMARY KEY,
+        title VARCHAR(200) NOT NULL,
+        description TEXT,
+        date DATE,
+        time TIME,
+        venue VARCHAR(100),
+        organizer VARCHAR(100),
+        capacity INTEGER,
+        registered_count INTEGER DEFAULT 0,
+        attended_count INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    
+    CREATE TABLE IF NOT EXISTS registrations (
+        id SERIAL PRIMARY KEY,
+        student_id INTEGER REFERENCES students(id) ON DELETE CASCADE,
+        event_id INTEGER REFERENCES events(id) ON DELETE CASCADE,
+        registration_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        checkin_time TIMESTAMP,
+        attended BOOLEAN DEFAULT FALSE,
+        UNIQUE(student_id, event_id)
+    );
+    
+    CREATE TABLE IF NOT EXISTS staff (
+        id SERIAL PRIMARY KEY,
+        username VARCHAR(50) UNIQUE NOT NULL,
+        password VARCHAR(255) NOT NULL,
+        name VARCHAR(100) NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    
+    CREATE TABLE IF NOT EXISTS admins (
+        id SERIAL PRIMARY KEY,
+        username VARCHAR(50) UNIQUE NOT NULL,
+        password VARCHAR(255) NOT NULL,
+        name VARCHAR(100) NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    
+    -- Indexes for the hot lookup paths. registrations(student_id, event_id)
+    -- and students(student_id) are already covered by their UNIQUE constraints.
+    -- Upcoming events filter on date and sort by (date, time)
+    CREATE INDEX IF NOT EXISTS idx_events_date_time ON events(date, time);
+    DROP INDEX IF EXISTS idx_events_date;
+    CREATE INDEX IF NOT EXISTS idx_events_title ON events(title);
+    
+    -- Per-event registration lists and exports, already in display order
+    CREATE INDEX IF NOT EXISTS idx_reg_event_time ON registrations(event_id, registration_time);
+    -- Attendance-only reads; partial, so unattended rows cost nothing
+    CREATE INDEX IF NOT EXISTS idx_reg_event_checkin ON registrations(event_id, checkin_time) WHERE attended;
+    CREATE INDEX IF NOT EXISTS idx_reg_attended_checkin ON registrations(checkin_time DESC) WHERE attended;
+    
+    -- Password hashes are longer than the original VARCHAR(100) columns
+    ALTER TABLE students ALTER COLUMN password TYPE VARCHAR(255);
+    ALTER TABLE staff ALTER COLUMN password TYPE VARCHAR(255);
+    ALTER TABLE admins ALTER COLUMN password TYPE VARCHAR(255);
+    
+    -- QR codes are rendered on demand from the registration id; the stored
+    -- base64 images are no longer read or written
+    ALTER TABLE registrations DROP COLUMN IF EXISTS qr_code_path;
+    
+    -- Case-insensitive email lookups for student login. Not UNIQUE: older
+    -- databases may hold emails that differ only by case, and a failing
+    -- CREATE UNIQUE INDEX would abort the whole migration
+    DROP INDEX IF EXISTS idx_students_email_lower;
+    CREATE INDEX IF NOT EXISTS idx_students_email_ci ON students (LOWER(email));
+    
+    ALTER TABLE events ADD COLUMN IF NOT EXISTS attended_count INTEGER DEFAULT 0;
+    
+    -- Keep events.registered_count and attended_count in step with
+    -- registrations, including rows removed by ON DELETE CASCADE from students
+    CREATE OR REPLACE FUNCTION bump_event_count() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE events SET registered_count = registered_count + 1,
+                              attended_count = attended_count + COALESCE(NEW.attended, FALSE)::int
+            WHERE id = NEW.event_id;
+        ELSIF TG_OP = 'DELETE' THEN
+            UPDATE events SET registered_count = registered_count - 1,
+                              attended_count = attended_count - COALESCE(OLD.attended, FALSE)::int
+            WHERE id = OLD.event_id;
+        ELSE
+            UPDATE events SET attended_count = attended_count
+                                               + COALESCE(NEW.attended, FALSE)::int
+                                               - COALESCE(OLD.attended, FALSE)::int
+            WHERE id = NEW.event_id;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    
+    DROP TRIGGER IF EXISTS registrations_event_count ON registrations;
+    CREATE TRIGGER registrations_event_count
+        AFTER INSERT OR DELETE ON registrations
+        FOR EACH ROW EXECUTE FUNCTION bump_event_count();
+    
+    -- Re-marking a registration with the same value leaves the event alone
+    DROP TRIGGER IF EXISTS registrations_event_attended ON registrations;
+    CREATE TRIGGER registrations_event_attended
+        AFTER UPDATE OF attended ON registrations
+        FOR EACH ROW WHEN (OLD.attended IS DISTINCT FROM NEW.attended)
+        EXECUTE FUNCTION bump_event_count();
+    
+    -- Resync counts that drifted before the triggers existed
+    UPDATE events e SET registered_count = c.registered, attended_count = c.attended
+    FROM (
+        SELECT ev.id,
+               COUNT(r.id) AS registered,
+               COUNT(r.id) FILTER (WHERE r.attended) AS attended
+        FROM events ev
+        LEFT JOIN registrations r ON r.event_id = ev.id
+        GROUP BY ev.id
+    ) c
+    WHERE e.id = c.id
+      AND (e.registered_count, e.attended_count) IS DISTINCT FROM (c.registered, c.attended);
+    
+    -- Exports rendered in the background, downloadable until expires_at
+    CREATE TABLE IF NOT EXISTS export_jobs (
+        id SERIAL PRIMARY KEY,
+        admin_id INTEGER REFERENCES admins(id) ON DELETE CASCADE,
+        event_id INTEGER REFERENCES events(id) ON DELETE CASCADE,
+        format VARCHAR(20) NOT NULL,
+        attendance_only BOOLEAN DEFAULT FALSE,
+        status VARCHAR(20) NOT NULL DEFAULT 'pending',
+        message TEXT,
+        path TEXT,
+        download_name TEXT,
+        mimetype VARCHAR(100),
+        sha256 CHAR(64),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        expires_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP + INTERVAL '1 hour'
+    );
+    
+    -- Export ETag the job was queued for, so unchanged exports reuse it
+    ALTER TABLE export_jobs ADD COLUMN IF NOT EXISTS etag CHAR(40);
+    
+    CREATE TABLE IF NOT EXISTS schema_version (
+        id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+        version INTEGER NOT NULL
+    );
+"""
+
+def get_schema_version(conn):
+    """Return the applied schema version, or 0 on a fresh database"""
+    with conn.cursor() as cursor:
+        try:
+            cursor.execute("SELECT version FROM schema_version")
+            row = cursor.fetchone()
+            return row[0] if row else 0
+        except psycopg2.errors.UndefinedTable:
+            conn.rollback()
+            return 0
+
+# Set once this process has seen the current schema; later calls are free
+_schema_ready = False
+
 def check_and_init_database():
     """Check if database tables exist, create if not"""
+    global _schema_ready
+    if _schema_ready:
+        return True
+    
+    conn = None
     try:
         print("🔍 Checking database tables...")
         
@@ -168,100 +712,296 @@ def check_and_init_database():
             print("❌ Cannot connect to database")
             return False
         
-        cursor = conn.cursor()
+        # Steady-state deploys only need this one query
+        if get_schema_version(conn) >= SCHEMA_VERSION:
+            print("✅ Database schema is up to date")
+            _schema_ready = True
+            return True
+        
+        # Workers booting together queue here; only the first applies the
+        # schema. The session lock is released when the connection closes.
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(hashtext('college_event_app.schema'))")
+        if get_schema_version(conn) >= SCHEMA_VERSION:
+            print("✅ Database schema was updated by another worker")
+            _schema_ready = True
+            return True
         
-        # Create tables if they don't exist
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS students (
-                id SERIAL PRIMARY KEY,
-                student_id VARCHAR(50) UNIQUE NOT NULL,
-                name VARCHAR(100) NOT NULL,
-                email VARCHAR(100) UNIQUE NOT NULL,
-                password VARCHAR(100) NOT NULL,
-                department VARCHAR(100),
-                year VARCHAR(10),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS events (
-                id SERIAL PRIMARY KEY,
-                title VARCHAR(200) NOT NULL,
-                description TEXT,
-                date DATE,
-                time TIME,
-                venue VARCHAR(100),
-                organizer VARCHAR(100),
-                capacity INTEGER,
-                registered_count INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS registrations (
-                id SERIAL PRIMARY KEY,
-                student_id INTEGER REFERENCES students(id) ON DELETE CASCADE,
-                event_id INTEGER REFERENCES events(id) ON DELETE CASCADE,
-                registration_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                qr_code_path TEXT,
-                checkin_time TIMESTAMP,
-                attended BOOLEAN DEFAULT FALSE,
-                UNIQUE(student_id, event_id)
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS staff (
-                id SERIAL PRIMARY KEY,
-                username VARCHAR(50) UNIQUE NOT NULL,
-                password VARCHAR(100) NOT NULL,
-                name VARCHAR(100) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        cursor = conn.cursor()
         
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS admins (
-                id SERIAL PRIMARY KEY,
-                username VARCHAR(50) UNIQUE NOT NULL,
-                password VARCHAR(100) NOT NULL,
-                name VARCHAR(100) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        # Create tables and indexes in a single round trip
+        cursor.execute(SCHEMA_SQL)
         
-        # Insert default admin if not exists
-        cursor.execute("""
-            INSERT INTO admins (username, password, name) 
-            VALUES ('admin', 'admin123', 'System Administrator')
-            ON CONFLICT (username) DO NOTHING
-        """)
+        # Insert default admin and staff if not exists
+        bulk_insert(
+            'admins', ('username', 'password', 'name'),
+            [('admin', generate_password_hash('admin123'), 'System Administrator')],
+            on_conflict='(username) DO NOTHING', cursor=cursor
+        )
+        bulk_insert(
+            'staff', ('username', 'password', 'name'),
+            [('staff', generate_password_hash('staff123'), 'Event Staff')],
+            on_conflict='(username) DO NOTHING', cursor=cursor
+        )
         
-        # Insert default staff if not exists
         cursor.execute("""
-            INSERT INTO staff (username, password, name) 
-            VALUES ('staff', 'staff123', 'Event Staff')
-            ON CONFLICT (username) DO NOTHING
-        """)
+            INSERT INTO schema_version (id, version) VALUES (1, %s)
+            ON CONFLICT (id) DO UPDATE SET version = EXCLUDED.version
+        """, (SCHEMA_VERSION,))
         
         conn.commit()
         cursor.close()
-        conn.close()
         
         print("✅ Database initialization complete")
+        _schema_ready = True
         return True
         
     except Exception as e:
         print(f"❌ Error initializing database: {e}")
         return False
+    finally:
+        if conn:
+            conn.close()
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create or upgrade the database schema"""
+    if not check_and_init_database():
+        raise click.ClickException('Database schema initialization failed')
 
-# Initialize database when app starts
+# Initialize database when app starts. Set RUN_DB_INIT=0 when a release step
+# runs `flask --app app init-db` instead, so workers skip the check entirely.
 print("🚀 Starting application...")
-with app.app_context():
-    check_and_init_database()
+if os.environ.get('RUN_DB_INIT', '1') == '1':
+    with app.app_context():
+        check_and_init_database()
+
+# Event columns rendered by the event listing and detail templates
+EVENT_COLUMNS = "id, title, description, date, time, venue, organizer, capacity, registered_count"
+
+# -----------------------
+# Query Caches
+# -----------------------
+UPCOMING_EVENTS_TTL = 60
+
+_upcoming_events_cache = TTLCache(maxsize=4, ttl=UPCOMING_EVENTS_TTL)
+_upcoming_events_lock = threading.Lock()
+
+def load_upcoming_events():
+    """Return today's upcoming events and a digest of them for ETags.
+
+    Shared across requests for up to a minute; the digest is None if the
+    query failed.
+    """
+    today = date.today()
+    with _upcoming_events_lock:
+        cached = _upcoming_events_cache.get(today)
+    
+    if cached is None:
+        upcoming_events = execute_query(
+            f"SELECT {EVENT_COLUMNS} FROM events WHERE date >= CURRENT_DATE ORDER BY date, time", 
+            fetchall=True
+        )
+        if upcoming_events is None:
+            return [], None
+        digest = hashlib.sha1(repr(upcoming_events).encode('utf-8')).hexdigest()
+        cached = (upcoming_events, digest)
+        with _upcoming_events_lock:
+            _upcoming_events_cache[today] = cached
+    return cached
+
+def invalidate_upcoming_events():
+    """Drop cached event lists after events or their counts change"""
+    with _upcoming_events_lock:
+        _upcoming_events_cache.clear()
+
+def get_export_event(event_id):
+    """Get the event details printed at the top of an export, or None.
+
+    Read fresh in the same query as the registration state its ETag covers,
+    so the header and the tag always match, whichever worker made the edit.
+    The students digest covers the student columns exports render.
+    """
+    return execute_query(
+        """SELECT e.title, TO_CHAR(e.date, 'DD-MM-YYYY') as event_date,
+                  e.time, e.venue, e.organizer, e.capacity,
+                  st.registrations, st.attended, st.last_registration,
+                  st.last_checkin, st.students
+           FROM events e
+           CROSS JOIN LATERAL (
+               SELECT COUNT(*) AS registrations,
+                      COUNT(*) FILTER (WHERE r.attended) AS attended,
+                      MAX(r.registration_time) AS last_registration,
+                      MAX(r.checkin_time) AS last_checkin,
+                      md5(string_agg(concat_ws(':', s.id, s.name, s.student_id,
+                                               s.department, s.year), ',' ORDER BY s.id)) AS students
+               FROM registrations r
+               JOIN students s ON s.id = r.student_id
+               WHERE r.event_id = e.id
+           ) st
+           WHERE e.id = %s""",
+        (event_id,), fetch=True
+    )
+
+# Admin dashboard totals and recent activity; registrations and check-ins
+# made elsewhere show up once the TTL lapses
+ADMIN_DASHBOARD_TTL = 30
+
+# Past this many rows the dashboard shows the planner's row estimate, kept
+# current by autovacuum, instead of scanning the whole table to count it
+EXACT_COUNT_LIMIT = 100000
+
+def row_count_sql(table):
+    """SQL for a table's row count, estimated from pg_class once it is large"""
+    return f"""(SELECT CASE WHEN c.reltuples > {EXACT_COUNT_LIMIT} THEN c.reltuples::bigint
+                            ELSE (SELECT COUNT(*) FROM {table}) END
+                FROM pg_class c WHERE c.oid = '{table}'::regclass)"""
+
+ADMIN_DASHBOARD_QUERY = f"""SELECT {row_count_sql('events')} AS events,
+           {row_count_sql('students')} AS students,
+           {row_count_sql('registrations')} AS registrations,
+           (SELECT json_agg(e) FROM (
+                SELECT id, title, LEFT(description, 121) AS description, date, time, venue
+                FROM events ORDER BY created_at DESC LIMIT 5
+            ) e) AS recent_events,
+           (SELECT json_agg(v) FROM (
+                SELECT s.name AS student_name, s.student_id, e.title AS event_title,
+                       r.checkin_time::text AS checkin_time
+                FROM registrations r
+                JOIN students s ON r.student_id = s.id
+                JOIN events e ON r.event_id = e.id
+                WHERE r.attended = TRUE
+                ORDER BY r.checkin_time DESC
+                LIMIT 10
+            ) v) AS recent_verifications"""
+
+_admin_dashboard_cache = TTLCache(maxsize=1, ttl=ADMIN_DASHBOARD_TTL)
+_admin_dashboard_lock = threading.Lock()
+
+def get_admin_dashboard():
+    """Get the admin dashboard totals and recent lists, or None on error"""
+    with _admin_dashboard_lock:
+        dashboard = _admin_dashboard_cache.get('dashboard')
+    
+    if dashboard is None:
+        # Totals and both recent lists in a single round trip
+        dashboard = execute_query(ADMIN_DASHBOARD_QUERY, fetch=True)
+        if dashboard is None:
+            return None
+        # json_agg hands dates back as ISO text; split once per cache fill.
+        # events.date is nullable, so undated events get empty badge fields
+        for event in dashboard['recent_events'] or []:
+            if event['date']:
+                event['date_year'], event['date_month'], event['date_day'] = event['date'].split('-')
+            else:
+                event['date_year'] = event['date_month'] = event['date_day'] = ''
+        with _admin_dashboard_lock:
+            _admin_dashboard_cache['dashboard'] = dashboard
+    return dashboard
+
+def invalidate_admin_dashboard():
+    """Drop the cached admin dashboard after an admin changes its data"""
+    with _admin_dashboard_lock:
+        _admin_dashboard_cache.clear()
+
+# -----------------------
+# QR Codes
+# -----------------------
+# Renders QR codes for new registrations after the response has been sent
+QR_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix='qr')
+
+def registration_qr_mac(registration_id):
+    """Truncated HMAC-SHA256 of a registration id, as 16 base32 characters"""
+    digest = hmac.new(app.secret_key.encode(), f'registration-qr:{registration_id}'.encode(),
+                      hashlib.sha256).digest()
+    return base64.b32encode(digest[:10]).decode('ascii')
+
+def registration_qr_data(registration_id):
+    """Signed payload encoded in a registration's QR code.
+
+    "<id>.<MAC>" uses only digits, capitals and '.', so qrcode encodes it in
+    alphanumeric mode and it fits a version 1 (21x21) symbol.
+    """
+    return f"{registration_id}.{registration_qr_mac(registration_id)}"
+
+# Printed size of one QR module
+QR_MODULE_MM = 0.6
+
+@functools.lru_cache(maxsize=2048)
+def render_qr_svg(qr_data):
+    """Render a QR payload to SVG bytes.
+
+    Payloads are deterministic per registration, so repeat renders are
+    served from memory. The path is drawn in module units with one
+    rectangle per horizontal run of dark modules, rather than one per module.
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        border=4,
+    )
+    qr.add_data(qr_data)
+    qr.make(fit=True)
+    
+    matrix = qr.get_matrix()
+    size = len(matrix)
+    path = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if row[x]:
+                start = x
+                while x < size and row[x]:
+                    x += 1
+                path.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+            else:
+                x += 1
+    
+    width = f"{size * QR_MODULE_MM:g}mm"
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" version="1.1" width="{width}" height="{width}" '
+        f'viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path fill="#000" d="{"".join(path)}"/></svg>'
+    ).encode('utf-8')
+
+def prerender_registration_qr(registration_id):
+    """Warm the QR cache in the background so the first view is a cache hit.
+
+    Under gevent QR_POOL's threads are greenlets, so the render goes to the
+    hub's OS thread pool instead, as in run_blocking.
+    """
+    qr_data = registration_qr_data(registration_id)
+    if GEVENT_ACTIVE:
+        import gevent
+        gevent.get_hub().threadpool.spawn(render_qr_svg, qr_data)
+    else:
+        QR_POOL.submit(render_qr_svg, qr_data)
+
+# -----------------------
+# Conditional Pages
+# -----------------------
+# Session values the shared layout renders, so they are part of every page ETag
+PAGE_SESSION_KEYS = ('admin_id', 'admin_name', 'student_id', 'student_name', 'staff_id', 'staff_name')
 
+def page_etag(*parts):
+    """ETag for a page built from parts, as seen by the current session"""
+    viewer = tuple(session.get(key) for key in PAGE_SESSION_KEYS)
+    return hashlib.sha1(repr((viewer,) + parts).encode('utf-8')).hexdigest()
+
+def conditional_page(etag, render):
+    """Answer 304 if the client already has the page tagged etag, else render it.
+
+    Pages with a pending flash message always render so it gets shown.
+    """
+    if etag and '_flashes' not in session and request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = make_response(render())
+    if etag:
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 # -----------------------
 # Basic pages & auth flows
@@ -282,7 +1022,7 @@ def register():
         year = request.form['year']
         
         existing_student = execute_query(
-            "SELECT * FROM students WHERE student_id = %s OR email = %s", 
+            "SELECT 1 FROM students WHERE student_id = %s OR LOWER(email) = LOWER(%s)", 
             (student_id, email), 
             fetch=True
         )
@@ -293,7 +1033,7 @@ def register():
         
         execute_query(
             "INSERT INTO students (student_id, name, email, password, department, year) VALUES (%s, %s, %s, %s, %s, %s)",
-            (student_id, name, email, password, department, year)
+            (student_id, name, email, run_blocking(generate_password_hash, password), department, year)
         )
         
         flash('Registration successful! Please login.', 'success')
@@ -308,13 +1048,15 @@ def login():
         email = request.form['email']
         password = request.form['password']
         
-        student = execute_query(
-            "SELECT * FROM students WHERE email = %s AND password = %s", 
-            (email, password), 
+        student = execute_prepared(
+            'student_by_email',
+            """SELECT id, name, password FROM students WHERE LOWER(email) = LOWER($1)
+               ORDER BY email = $1 DESC, id LIMIT 1""", 
+            (email,), 
             fetch=True
         )
         
-        if student:
+        if student and verify_password('students', student, password):
             session['student_id'] = student['id']
             session['student_name'] = student['name']
             flash(f'Welcome back, {student["name"]}!', 'success')
@@ -331,27 +1073,26 @@ def dashboard():
         return redirect(url_for('login'))
     
     # Get upcoming events
-    today = datetime.now().strftime('%Y-%m-%d')
-    upcoming_events = execute_query(
-        "SELECT * FROM events WHERE date >= %s ORDER BY date, time", 
-        (today,), 
-        fetchall=True
-    ) or []
+    upcoming_events, events_digest = load_upcoming_events()
     
-    # Get student's registrations
-    registrations = execute_query(
-        """SELECT e.*, r.registration_time, r.qr_code_path 
-           FROM events e 
-           JOIN registrations r ON e.id = r.event_id 
-           WHERE r.student_id = %s""",
+    # Get student's registrations; the page only counts them, so the
+    # (student_id, event_id) unique index answers this without the heap
+    registrations = execute_prepared(
+        'dashboard_registrations',
+        "SELECT event_id FROM registrations WHERE student_id = $1 ORDER BY event_id",
         (session['student_id'],),
         fetchall=True
-    ) or []
+    )
     
-    return render_template('dashboard.html', 
-                         student_name=session['student_name'],
-                         upcoming_events=upcoming_events,
-                         registrations=registrations)
+    # Revisits with nothing changed skip rendering and the page body
+    etag = None
+    if events_digest and registrations is not None:
+        etag = page_etag('dashboard', events_digest, registrations)
+    return conditional_page(etag, lambda: render_template(
+        'dashboard.html',
+        student_name=session['student_name'],
+        upcoming_events=upcoming_events,
+        registrations=registrations or []))
 
 # Events page
 @app.route('/events')
@@ -359,14 +1100,11 @@ def events():
     if 'student_id' not in session:
         return redirect(url_for('login'))
     
-    today = datetime.now().strftime('%Y-%m-%d')
-    events_list = execute_query(
-        "SELECT * FROM events WHERE date >= %s ORDER BY date, time", 
-        (today,), 
-        fetchall=True
-    ) or []
+    events_list, events_digest = load_upcoming_events()
     
-    return render_template('events.html', events=events_list)
+    # The digest comes with the cached list, so revisits need no query
+    etag = page_etag('events', events_digest) if events_digest else None
+    return conditional_page(etag, lambda: render_template('events.html', events=events_list))
 
 # Event details and registration
 @app.route('/event/<int:event_id>')
@@ -374,8 +1112,9 @@ def event_details(event_id):
     if 'student_id' not in session:
         return redirect(url_for('login'))
     
-    event = execute_query(
-        "SELECT * FROM events WHERE id = %s", 
+    event = execute_prepared(
+        'event_by_id',
+        f"SELECT {EVENT_COLUMNS} FROM events WHERE id = $1", 
         (event_id,), 
         fetch=True
     )
@@ -384,8 +1123,9 @@ def event_details(event_id):
         flash('Event not found!', 'error')
         return redirect(url_for('events'))
     
-    registration = execute_query(
-        "SELECT * FROM registrations WHERE student_id = %s AND event_id = %s", 
+    registration = execute_prepared(
+        'registration_by_student_event',
+        "SELECT id, registration_time FROM registrations WHERE student_id = $1 AND event_id = $2", 
         (session['student_id'], event_id), 
         fetch=True
     )
@@ -398,86 +1138,78 @@ def register_event(event_id):
     if 'student_id' not in session:
         return redirect(url_for('login'))
     
-    event = execute_query(
-        "SELECT * FROM events WHERE id = %s", 
-        (event_id,), 
+    # Capacity check, duplicate check and insert in one round trip; the
+    # registrations trigger bumps registered_count. The event row is locked
+    # first so concurrent registrations queue on it and each sees the latest
+    # registered_count; ON CONFLICT rejects duplicates.
+    registration = execute_prepared(
+        'register_event',
+        """WITH ev AS (
+               SELECT id, title, date, time, venue, capacity, registered_count
+               FROM events WHERE id = $1
+               FOR UPDATE
+           ), ins AS (
+               INSERT INTO registrations (student_id, event_id)
+               SELECT $2, ev.id FROM ev
+               WHERE ev.registered_count < ev.capacity
+                 AND EXISTS (SELECT 1 FROM students WHERE id = $2)
+               ON CONFLICT (student_id, event_id) DO NOTHING
+               RETURNING id
+           )
+           SELECT (SELECT id FROM ins) AS registration_id,
+                  EXISTS (SELECT 1 FROM registrations
+                          WHERE student_id = $2 AND event_id = ev.id) AS already_registered,
+                  ev.registered_count >= ev.capacity AS is_full,
+                  s.name AS student_name
+           FROM ev
+           LEFT JOIN students s ON s.id = $2""",
+        (event_id, session['student_id']),
         fetch=True
     )
     
-    if not event:
+    if not registration:
         flash('Event not found!', 'error')
         return redirect(url_for('events'))
     
-    if event['registered_count'] >= event['capacity']:
-        flash('Event is full!', 'error')
+    if registration['student_name'] is None:
+        flash('Student not found!', 'error')
+        return redirect(url_for('events'))
+    
+    if registration['registration_id'] is None:
+        if registration['already_registered']:
+            flash('You are already registered for this event!', 'error')
+        else:
+            flash('Event is full!', 'error')
         return redirect(url_for('event_details', event_id=event_id))
     
-    existing_registration = execute_query(
-        "SELECT * FROM registrations WHERE student_id = %s AND event_id = %s", 
-        (session['student_id'], event_id), 
-        fetch=True
-    )
+    invalidate_upcoming_events()
+    prerender_registration_qr(registration['registration_id'])
     
-    if existing_registration:
-        flash('You are already registered for this event!', 'error')
-        return redirect(url_for('event_details', event_id=event_id))
+    flash('Successfully registered for the event! QR code generated.', 'success')
+    return redirect(url_for('event_details', event_id=event_id))
+
+# Registration QR code, rendered on demand from the registration id
+@app.route('/qr/<int:registration_id>.svg')
+def registration_qr(registration_id):
+    if 'student_id' not in session and 'admin_id' not in session:
+        return redirect(url_for('login'))
     
-    student = execute_query(
-        "SELECT * FROM students WHERE id = %s", 
-        (session['student_id'],), 
+    registration = execute_prepared(
+        'registration_owner',
+        "SELECT student_id FROM registrations WHERE id = $1",
+        (registration_id,),
         fetch=True
     )
     
-    if not student:
-        flash('Student not found!', 'error')
-        return redirect(url_for('events'))
+    if not registration:
+        abort(404)
+    if 'admin_id' not in session and registration['student_id'] != session['student_id']:
+        abort(404)
     
-    try:
-        qr_data = f"""
-Event: {event['title']}
-Student: {student['name']}
-Student ID: {student['student_id']}
-Event Date: {event['date']}
-Event Time: {event['time']}
-Venue: {event['venue']}
-Registration ID: {student['student_id']}_{event_id}
-        """.strip()
-        
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        
-        qr_img = qr.make_image(fill_color="black", back_color="white")
-        
-        buffer = BytesIO()
-        qr_img.save(buffer, format="PNG")
-        buffer.seek(0)
-        
-        qr_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-        qr_web_path = f"data:image/png;base64,{qr_base64}"
-        
-        execute_query(
-            "INSERT INTO registrations (student_id, event_id, qr_code_path) VALUES (%s, %s, %s)",
-            (session['student_id'], event_id, qr_web_path)
-        )
-        
-        execute_query(
-            "UPDATE events SET registered_count = registered_count + 1 WHERE id = %s",
-            (event_id,)
-        )
-        
-        flash('Successfully registered for the event! QR code generated.', 'success')
-        return redirect(url_for('event_details', event_id=event_id))
-        
-    except Exception as e:
-        print(f"Error in register_event: {str(e)}")
-        flash('Error generating QR code. Please try again.', 'error')
-        return redirect(url_for('event_details', event_id=event_id))
+    response = Response(render_qr_svg(registration_qr_data(registration_id)), mimetype='image/svg+xml')
+    # The payload never changes for a registration id
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
 
 # My registrations
 @app.route('/my_registrations')
@@ -485,11 +1217,13 @@ def my_registrations():
     if 'student_id' not in session:
         return redirect(url_for('login'))
     
-    registrations = execute_query(
-        """SELECT e.*, r.registration_time, r.qr_code_path, r.attended 
+    registrations = execute_prepared(
+        'my_registrations',
+        """SELECT e.id, e.title, LEFT(e.description, 121) AS description, e.date, e.time, e.venue,
+                  r.id AS registration_id, r.registration_time
            FROM events e 
            JOIN registrations r ON e.id = r.event_id 
-           WHERE r.student_id = %s 
+           WHERE r.student_id = $1 
            ORDER BY e.date, e.time""",
         (session['student_id'],),
         fetchall=True
@@ -504,13 +1238,14 @@ def staff_login():
         username = request.form['username']
         password = request.form['password']
         
-        staff = execute_query(
-            "SELECT * FROM staff WHERE username = %s AND password = %s", 
-            (username, password), 
+        staff = execute_prepared(
+            'staff_by_username',
+            "SELECT id, name, password FROM staff WHERE username = $1", 
+            (username,), 
             fetch=True
         )
         
-        if staff:
+        if staff and verify_password('staff', staff, password):
             session['staff_id'] = staff['id']
             session['staff_name'] = staff['name']
             flash(f'Welcome, {staff["name"]}!', 'success')
@@ -527,6 +1262,67 @@ def staff_dashboard():
         return redirect(url_for('staff_login'))
     return render_template('staff_dashboard.html')
 
+_QR_LINE_RE = re.compile(r'^[ \t]*([^:\n]+?)[ \t]*:[ \t]*(.*?)[ \t\r]*$', re.M)
+QR_REQUIRED_KEYS = ('Event', 'Student ID')
+
+def parse_qr(qr_data):
+    """Parse legacy "Key: value" QR text, or None if required keys are missing"""
+    qr_dict = dict(_QR_LINE_RE.findall(qr_data))
+    if not all(qr_dict.get(key) for key in QR_REQUIRED_KEYS):
+        return None
+    return qr_dict
+
+def load_qr_registration_id(qr_data):
+    """Return the registration id from a signed QR token, or None"""
+    qr_data = qr_data.strip()
+    registration_id, _, mac = qr_data.partition('.')
+    if registration_id.isdigit():
+        if hmac.compare_digest(mac, registration_qr_mac(int(registration_id))):
+            return int(registration_id)
+        return None
+    
+    # Tokens issued before the compact format
+    try:
+        payload = qr_serializer.loads(qr_data)
+    except BadSignature:
+        return None
+    return payload.get('rid') if isinstance(payload, dict) else None
+
+# Check-in for the registration picked by {lookup}, in one round trip
+CHECK_IN_QUERY = """WITH reg AS ({lookup}), checkin AS (
+        UPDATE registrations SET attended = TRUE, checkin_time = NOW()
+        WHERE id = (SELECT id FROM reg) AND attended = FALSE
+        RETURNING id, checkin_time
+    )
+    SELECT (SELECT checkin_time FROM checkin) AS checkin_time,
+           s.name, s.student_id, s.department, s.year,
+           e.id AS event_id, e.title, e.date, e.time, e.venue, e.organizer
+    FROM registrations r
+    JOIN students s ON r.student_id = s.id
+    JOIN events e ON r.event_id = e.id
+    WHERE r.id = (SELECT id FROM reg)"""
+
+CHECK_IN_BY_ID = CHECK_IN_QUERY.format(lookup="SELECT $1::integer AS id")
+CHECK_IN_BY_QR_TEXT = CHECK_IN_QUERY.format(lookup="""SELECT r.id FROM registrations r
+        JOIN students s ON r.student_id = s.id
+        JOIN events e ON r.event_id = e.id
+        WHERE s.student_id = $1 AND e.title = $2
+        LIMIT 1""")
+
+def check_in_registration(registration_id):
+    """Mark a registration attended in one round trip.
+
+    Returns the student/event details, with checkin_time set to None when the
+    student had already checked in, or None if the registration does not exist.
+    """
+    return execute_prepared('check_in_registration', CHECK_IN_BY_ID,
+                            (registration_id,), fetch=True)
+
+def check_in_by_qr_text(student_id, event_title):
+    """check_in_registration for a legacy QR's student ID and event title"""
+    return execute_prepared('check_in_by_qr_text', CHECK_IN_BY_QR_TEXT,
+                            (student_id, event_title), fetch=True)
+
 # Staff QR verification
 @app.route('/staff/verify', methods=['POST'])
 def staff_verify():
@@ -539,75 +1335,48 @@ def staff_verify():
         return jsonify({'success': False, 'message': 'No QR data provided'})
     
     try:
-        lines = qr_data.strip().split('\n')
-        qr_dict = {}
-        for line in lines:
-            if ':' in line:
-                key, value = line.split(':', 1)
-                qr_dict[key.strip()] = value.strip()
-        
-        event_title = qr_dict.get('Event', '')
-        student_id_str = qr_dict.get('Student ID', '')
+        registration_id = load_qr_registration_id(qr_data)
         
-        if not event_title or not student_id_str:
-            return jsonify({'success': False, 'message': 'Invalid QR code format'})
-        
-        student = execute_query(
-            "SELECT * FROM students WHERE student_id = %s", 
-            (student_id_str,), 
-            fetch=True
-        )
-        
-        event = execute_query(
-            "SELECT * FROM events WHERE title = %s", 
-            (event_title,), 
-            fetch=True
-        )
-        
-        if not student:
-            return jsonify({'success': False, 'message': 'Student not found'})
-        
-        if not event:
-            return jsonify({'success': False, 'message': 'Event not found'})
-        
-        registration = execute_query(
-            "SELECT * FROM registrations WHERE student_id = %s AND event_id = %s", 
-            (student['id'], event['id']), 
-            fetch=True
-        )
-        
-        if not registration:
-            return jsonify({'success': False, 'message': 'Student not registered for this event'})
+        if registration_id is not None:
+            checkin = check_in_registration(registration_id)
+            
+            if not checkin:
+                return jsonify({'success': False, 'message': 'Registration not found'})
+        else:
+            # QR codes issued before signed tokens carry "Key: value" lines
+            qr_dict = parse_qr(qr_data)
+            
+            if qr_dict is None:
+                return jsonify({'success': False, 'message': 'Invalid QR code format'})
+            
+            checkin = check_in_by_qr_text(qr_dict['Student ID'], qr_dict['Event'])
+            
+            if not checkin:
+                return jsonify({'success': False, 'message': 'Student not registered for this event'})
         
-        if registration['attended']:
+        if checkin['checkin_time'] is None:
             return jsonify({
                 'success': False, 
-                'message': f"Student {student['name']} has already checked in for this event"
+                'message': f"Student {checkin['name']} has already checked in for this event"
             })
         
-        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        execute_query(
-            "UPDATE registrations SET attended = TRUE, checkin_time = %s WHERE student_id = %s AND event_id = %s",
-            (current_time, student['id'], event['id'])
-        )
-        
         return jsonify({
             'success': True,
             'student': {
-                'name': student['name'],
-                'student_id': student['student_id'],
-                'department': student['department'],
-                'year': student['year']
+                'name': checkin['name'],
+                'student_id': checkin['student_id'],
+                'department': checkin['department'],
+                'year': checkin['year']
             },
             'event': {
-                'id': event['id'],
-                'title': event['title'],
-                'date': event['date'],
-                'time': event['time'],
-                'venue': event['venue'],
-                'organizer': event['organizer']
+                'id': checkin['event_id'],
+                'title': checkin['title'],
+                'date': str(checkin['date']),
+                'time': str(checkin['time']),
+                'venue': checkin['venue'],
+                'organizer': checkin['organizer']
             },
-            'checkin_time': current_time
+            'checkin_time': checkin['checkin_time'].strftime('%Y-%m-%d %H:%M:%S')
         })
         
     except Exception as e:
@@ -636,8 +1405,13 @@ def admin_login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        admin = execute_query("SELECT * FROM admins WHERE username = %s AND password = %s", (username, password), fetch=True)
-        if admin:
+        admin = execute_prepared(
+            'admin_by_username',
+            "SELECT id, name, password FROM admins WHERE username = $1",
+            (username,),
+            fetch=True
+        )
+        if admin and verify_password('admins', admin, password):
             session['admin_id'] = admin['id']
             session['admin_name'] = admin['name']
             flash(f'Welcome, {admin["name"]}!', 'success')
@@ -651,28 +1425,15 @@ def admin_dashboard():
     if 'admin_id' not in session:
         return redirect(url_for('admin_login'))
 
-    total_events = execute_query("SELECT COUNT(*) as count FROM events", fetch=True)
-    total_students = execute_query("SELECT COUNT(*) as count FROM students", fetch=True)
-    total_registrations = execute_query("SELECT COUNT(*) as count FROM registrations", fetch=True)
-
-    recent_events = execute_query("SELECT * FROM events ORDER BY created_at DESC LIMIT 5", fetchall=True) or []
-    
-    recent_verifications = execute_query(
-        """SELECT s.name as student_name, s.student_id, e.title as event_title, r.checkin_time
-           FROM registrations r
-           JOIN students s ON r.student_id = s.id
-           JOIN events e ON r.event_id = e.id
-           WHERE r.attended = TRUE
-           ORDER BY r.checkin_time DESC
-           LIMIT 10""",
-        fetchall=True
-    ) or []
+    totals = get_admin_dashboard() or {}
+    recent_events = totals.get('recent_events') or []
+    recent_verifications = totals.get('recent_verifications') or []
 
     return render_template('admin_dashboard.html',
                            admin_name=session.get('admin_name'),
-                           total_events=total_events['count'] if total_events else 0,
-                           total_students=total_students['count'] if total_students else 0,
-                           total_registrations=total_registrations['count'] if total_registrations else 0,
+                           total_events=totals.get('events', 0),
+                           total_students=totals.get('students', 0),
+                           total_registrations=totals.get('registrations', 0),
                            recent_events=recent_events,
                            recent_verifications=recent_verifications)
 
@@ -681,7 +1442,14 @@ def admin_dashboard():
 def admin_events():
     if 'admin_id' not in session:
         return redirect(url_for('admin_login'))
-    events = execute_query("SELECT * FROM events ORDER BY date, time", fetchall=True) or []
+    # The list shows the first 60 characters of each description; one more
+    # keeps the template's "..." check working
+    events = execute_query(
+        """SELECT id, title, LEFT(description, 61) AS description, date, time,
+                  venue, organizer, capacity, registered_count
+           FROM events ORDER BY date, time""",
+        fetchall=True
+    ) or []
     return render_template('admin_events.html', events=events)
 
 # Create Event
@@ -699,11 +1467,20 @@ def create_event():
         organizer = request.form['organizer']
         capacity = request.form['capacity']
 
-        execute_query("""
+        # RETURNING tells a failed insert apart without a follow-up SELECT
+        event = execute_query("""
             INSERT INTO events 
             (title, description, date, time, venue, organizer, capacity, registered_count, created_at) 
             VALUES (%s, %s, %s, %s, %s, %s, %s, 0, CURRENT_TIMESTAMP)
-        """, (title, description, date, time, venue, organizer, capacity))
+            RETURNING id
+        """, (title, description, date, time, venue, organizer, capacity), fetch=True)
+
+        if not event:
+            flash('Error creating event!', 'error')
+            return redirect(url_for('create_event'))
+
+        invalidate_upcoming_events()
+        invalidate_admin_dashboard()
 
         flash('Event created successfully!', 'success')
         return redirect(url_for('admin_events'))
@@ -716,7 +1493,7 @@ def edit_event(event_id):
     if 'admin_id' not in session:
         return redirect(url_for('admin_login'))
 
-    event = execute_query("SELECT * FROM events WHERE id = %s", (event_id,), fetch=True)
+    event = execute_query(f"SELECT {EVENT_COLUMNS} FROM events WHERE id = %s", (event_id,), fetch=True)
 
     if not event:
         flash("Event not found!", "error")
@@ -736,6 +1513,8 @@ def edit_event(event_id):
             SET title = %s, description = %s, date = %s, time = %s, venue = %s, organizer = %s, capacity = %s
             WHERE id = %s
         """, (title, description, date, time, venue, organizer, capacity, event_id))
+        invalidate_upcoming_events()
+        invalidate_admin_dashboard()
 
         flash("Event updated successfully!", "success")
         return redirect(url_for('admin_events'))
@@ -748,13 +1527,15 @@ def delete_event(event_id):
     if 'admin_id' not in session:
         return redirect(url_for('admin_login'))
 
-    event = execute_query("SELECT * FROM events WHERE id = %s", (event_id,), fetch=True)
+    # Registrations go with the event through ON DELETE CASCADE
+    event = execute_query("DELETE FROM events WHERE id = %s RETURNING id", (event_id,), fetch=True)
 
     if not event:
         flash("Event not found!", "error")
         return redirect(url_for('admin_events'))
 
-    execute_query("DELETE FROM events WHERE id = %s", (event_id,))
+    invalidate_upcoming_events()
+    invalidate_admin_dashboard()
 
     flash("Event deleted successfully!", "success")
     return redirect(url_for('admin_events'))
@@ -765,22 +1546,159 @@ def event_registrations(event_id):
     if 'admin_id' not in session:
         return redirect(url_for('admin_login'))
 
-    event = execute_query("SELECT * FROM events WHERE id = %s", (event_id,), fetch=True)
+    event = execute_query(
+        "SELECT id, title, capacity, registered_count, attended_count FROM events WHERE id = %s",
+        (event_id,), fetch=True
+    )
     registrations = execute_query(
-        """SELECT r.*, s.name, s.student_id, s.department, s.year
+        """SELECT r.attended, r.registration_time,
+                  s.name, s.student_id, s.department, s.year
            FROM registrations r
            JOIN students s ON r.student_id = s.id
            WHERE r.event_id = %s
            ORDER BY r.registration_time""",
         (event_id,), fetchall=True) or []
 
-    return render_template('event_registrations.html', event=event, registrations=registrations)
+    return render_template('event_registrations.html', event=event, registrations=registrations)
+
+# -----------------------
+# PDF Styles
+# -----------------------
+# Built once at import and shared by every export; reportlab only reads them
+if REPORTLAB_AVAILABLE:
+    PDF_STYLES = getSampleStyleSheet()
+    PDF_HEADER_COLOR = colors.HexColor('#2c3e50')
+
+    # All-attendance report
+    ATTENDANCE_PDF_TABLE_STYLE = TableStyle([
+        # Header
+        ('BACKGROUND', (0, 0), (-1, 0), PDF_HEADER_COLOR),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('TOPPADDING', (0, 0), (-1, 0), 8),
+        
+        # Data rows
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('ALIGN', (0, 1), (3, -1), 'CENTER'),  # Center align first 4 columns
+        ('ALIGN', (4, 1), (-1, -1), 'LEFT'),   # Left align last 3 columns
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        
+        # Grid
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        
+        # Row height
+        ('ROWHEIGHTS', (0, 0), (-1, -1), 25),
+    ])
+
+    # Per-event registrations report
+    EVENT_PDF_TABLE_STYLE = TableStyle([
+        # Header
+        ('BACKGROUND', (0, 0), (-1, 0), PDF_HEADER_COLOR),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+        ('TOPPADDING', (0, 0), (-1, 0), 10),
+        
+        # Data rows
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('ROWHEIGHTS', (0, 0), (-1, -1), 25),
+    ])
+
+    # Attendance table with a trailing summary row
+    SUMMARY_PDF_TABLE_STYLE = TableStyle([
+        # Header style
+        ('BACKGROUND', (0, 0), (-1, 0), PDF_HEADER_COLOR),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+        
+        # Data rows style
+        ('BACKGROUND', (0, 1), (-1, -2), colors.white),
+        ('TEXTCOLOR', (0, 1), (-1, -2), colors.black),
+        ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -2), 8),
+        ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        
+        # Grid lines
+        ('GRID', (0, 0), (-1, -2), 0.5, colors.grey),
+        
+        # Summary row style
+        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#ecf0f1')),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, -1), (-1, -1), 9),
+        ('ALIGN', (0, -1), (-1, -1), 'LEFT'),
+    ])
+
+    # Generic DataFrame export
+    DATAFRAME_PDF_TABLE_STYLE = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c7be5')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('GRID', (0, 0), (-1, -1), 0.3, colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTSIZE', (0, 0), (-1, -1), 7),
+    ])
+
+# reportlab re-lays out the rest of a table each time it splits one across
+# pages, so long tables are cut into blocks that each start a fresh page
+PDF_TABLE_BLOCK_ROWS = 500
+
+def pdf_table_blocks(header, rows, style, col_widths=None, block_rows=PDF_TABLE_BLOCK_ROWS):
+    """Return flowables laying rows out as header-led tables of block_rows"""
+    flowables = []
+    for start in range(0, max(len(rows), 1), block_rows):
+        if flowables:
+            flowables.append(PageBreak())
+        table = Table([header] + rows[start:start + block_rows],
+                      colWidths=col_widths, repeatRows=1)
+        table.setStyle(style)
+        flowables.append(table)
+    return flowables
 
 # -----------------------
 # Admin: Export All Attendance
 # -----------------------
 # Replace the current export_attendance_all function with this fixed version:
 
+def export_attendance_etag(fmt):
+    """ETag for the all-attendance export that changes whenever its rows could"""
+    state = execute_query(
+        """SELECT COUNT(*) AS attended,
+                  MAX(checkin_time) AS last_checkin,
+                  (SELECT md5(string_agg(id || ':' || title || ':' || date, ',' ORDER BY id))
+                   FROM events) AS events,
+                  -- Student columns the export renders, so edits to them
+                  -- are not answered with 304
+                  (SELECT md5(string_agg(concat_ws(':', s.id, s.name, s.student_id,
+                                                   s.department, s.year), ',' ORDER BY s.id))
+                   FROM students s
+                   WHERE EXISTS (SELECT 1 FROM registrations
+                                 WHERE student_id = s.id AND attended)) AS students
+           FROM registrations WHERE attended""",
+        fetch=True
+    )
+    if state is None:
+        return None
+    key = repr(('attendance_all', fmt, sorted(state.items())))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
 @app.route('/admin/export/attendance_all')
 def export_attendance_all():
     """Export all attendance records"""
@@ -788,90 +1706,74 @@ def export_attendance_all():
         return redirect(url_for('admin_login'))
 
     fmt = request.args.get('format', 'csv').lower()
+    if fmt not in ('csv', 'excel', 'pdf', 'parquet', 'feather'):
+        flash('Unknown export format', 'error')
+        return redirect(url_for('admin_dashboard'))
+    
+    # Re-downloads of an unchanged export skip the query and rendering
+    etag = export_attendance_etag(fmt)
+    if etag and request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
     
-    # Fetch all attendance records
+    return tag_export_response(build_attendance_export(fmt), etag, fmt)
+
+def build_attendance_export(fmt):
+    """Render the all-attendance export as a download response"""
+    # Fetch all attendance records, already named and formatted for export
     query = """SELECT 
-                s.name as student_name,
-                s.student_id,
-                s.department,
-                s.year,
-                e.title as event_title,
-                TO_CHAR(e.date, 'DD-MM-YYYY') as event_date,
-                TO_CHAR(r.checkin_time, 'DD-MM-YYYY HH24:MI') as checkin_time
+                s.name AS "Student Name",
+                s.student_id AS "Student ID",
+                s.department AS "Department",
+                s.year AS "Year",
+                e.title AS "Event Title",
+                TO_CHAR(e.date, 'DD-MM-YYYY') AS "Event Date",
+                TO_CHAR(r.checkin_time, 'DD-MM-YYYY HH24:MI') AS "Check-in Time"
             FROM registrations r
             JOIN students s ON r.student_id = s.id
             JOIN events e ON r.event_id = e.id
             WHERE r.attended = TRUE
             ORDER BY r.checkin_time DESC"""
     
-    records = execute_query(query, fetchall=True) or []
-
-    if not records:
-        flash('No attendance records found!', 'warning')
-        return redirect(url_for('admin_dashboard'))
-    
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     
+    # Postgres writes the CSV itself through COPY
     if fmt == 'csv':
-        try:
-            # Create CSV
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            # Write header
-            writer.writerow(['Student Name', 'Student ID', 'Department', 'Year', 
-                            'Event Title', 'Event Date', 'Check-in Time'])
-            
-            # Write data
-            for record in records:
-                writer.writerow([
-                    record.get('student_name', ''),
-                    record.get('student_id', ''),
-                    record.get('department', ''),
-                    record.get('year', ''),
-                    record.get('event_title', ''),
-                    record.get('event_date', ''),
-                    record.get('checkin_time', '')
-                ])
-            
-            # Create response
-            csv_data = output.getvalue()
-            response = Response(
-                csv_data,
-                mimetype="text/csv",
-                headers={
-                    "Content-Disposition": f"attachment;filename=attendance_all_{timestamp}.csv"
-                }
-            )
-            return response
-            
-        except Exception as e:
-            flash(f'CSV export error: {str(e)}', 'error')
+        output, count = copy_query_csv(query)
+        if output is None:
+            flash('CSV export error: could not read attendance records', 'error')
             return redirect(url_for('admin_dashboard'))
+        if not count:
+            output.close()
+            flash('No attendance records found!', 'warning')
+            return redirect(url_for('admin_dashboard'))
+        return csv_chunks_response(stream_file(output), f"attendance_all_{timestamp}.csv")
+    
+    try:
+        rows = execute_query_iter(query)
+        first = next(rows, None)
+
+        if first is None:
+            flash('No attendance records found!', 'warning')
+            return redirect(url_for('admin_dashboard'))
+        
+        # Excel and Arrow formats stream straight from the cursor; PDF needs
+        # every row
+        headers = list(first.keys())
+        records = itertools.chain([first], rows)
+        if fmt == 'pdf':
+            records = list(records)
+    except Exception:
+        flash(f'{fmt.title()} export error: could not read attendance records', 'error')
+        return redirect(url_for('admin_dashboard'))
     
-    elif fmt == 'excel':
+    if fmt == 'excel':
         try:
-            # Create DataFrame
-            data = []
-            for record in records:
-                data.append({
-                    'Student Name': record.get('student_name', ''),
-                    'Student ID': record.get('student_id', ''),
-                    'Department': record.get('department', ''),
-                    'Year': record.get('year', ''),
-                    'Event Title': record.get('event_title', ''),
-                    'Event Date': record.get('event_date', ''),
-                    'Check-in Time': record.get('checkin_time', '')
-                })
-            
-            df = pd.DataFrame(data)
-            
-            # Create Excel in memory
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='Attendance')
-            
-            output.seek(0)
+            output = records_to_excel_file(
+                headers, (tuple(record.values()) for record in records),
+                sheet_name='Attendance'
+            )
             
             return send_file(
                 output,
@@ -890,11 +1792,6 @@ def export_attendance_all():
                 flash('PDF export requires ReportLab library', 'warning')
                 return redirect(url_for('admin_dashboard'))
             
-            from reportlab.lib import colors
-            from reportlab.lib.pagesizes import letter, landscape
-            from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-            from reportlab.lib.styles import getSampleStyleSheet
-            
             # Create PDF in memory
             pdf_buffer = BytesIO()
             
@@ -904,7 +1801,7 @@ def export_attendance_all():
                                    topMargin=30, bottomMargin=30)
             
             elements = []
-            styles = getSampleStyleSheet()
+            styles = PDF_STYLES
             
             # Add title
             title = Paragraph(f"<b>Attendance Report</b><br/>Generated on: {datetime.now().strftime('%d-%m-%Y %H:%M')}", 
@@ -913,53 +1810,12 @@ def export_attendance_all():
             elements.append(Spacer(1, 20))
             
             # Prepare table data
-            table_data = [['Student Name', 'Student ID', 'Department', 'Year', 
-                          'Event Title', 'Event Date', 'Check-in Time']]
-            
-            for record in records:
-                table_data.append([
-                    record.get('student_name', ''),
-                    record.get('student_id', ''),
-                    record.get('department', ''),
-                    record.get('year', ''),
-                    record.get('event_title', ''),
-                    record.get('event_date', ''),
-                    record.get('checkin_time', '')
-                ])
+            table_data = [list(record.values()) for record in records]
             
             # Create table with fixed column widths (sum should be less than page width)
             col_widths = [100, 80, 80, 40, 120, 70, 90]  # Total: ~580 points
             
-            table = Table(table_data, colWidths=col_widths, repeatRows=1)
-            
-            # Style the table
-            table.setStyle(TableStyle([
-                # Header
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 9),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-                ('TOPPADDING', (0, 0), (-1, 0), 8),
-                
-                # Data rows
-                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-                ('ALIGN', (0, 1), (3, -1), 'CENTER'),  # Center align first 4 columns
-                ('ALIGN', (4, 1), (-1, -1), 'LEFT'),   # Left align last 3 columns
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                
-                # Grid
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                
-                # Row height
-                ('ROWHEIGHTS', (0, 0), (-1, -1), 25),
-            ]))
-            
-            elements.append(table)
+            elements.extend(pdf_table_blocks(headers, table_data, ATTENDANCE_PDF_TABLE_STYLE, col_widths))
             
             # Add summary
             elements.append(Spacer(1, 20))
@@ -981,14 +1837,56 @@ def export_attendance_all():
             flash(f'PDF export error: {str(e)}', 'error')
             return redirect(url_for('admin_dashboard'))
     
-    else:
-        flash('Unknown export format', 'error')
-        return redirect(url_for('admin_dashboard'))
+    elif fmt in ('parquet', 'feather'):
+        if not PYARROW_AVAILABLE:
+            flash(f'{fmt.title()} export requires the pyarrow library', 'warning')
+            return redirect(url_for('admin_dashboard'))
+        
+        try:
+            return arrow_response(records, fmt, f"attendance_all_{timestamp}.{fmt}")
+            
+        except Exception as e:
+            flash(f'{fmt.title()} export error: {str(e)}', 'error')
+            return redirect(url_for('admin_dashboard'))
 
 
 # -----------------------
 # Export Event Registrations
 # -----------------------
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf',
+    'parquet': 'application/vnd.apache.parquet',
+    'feather': 'application/vnd.apache.arrow.file',
+}
+
+def tag_export_response(response, etag, fmt):
+    """Tag a rendered export for conditional re-downloads.
+
+    Only the requested format is tagged, not a CSV fallback or a redirect
+    after an error.
+    """
+    if etag and response.mimetype == EXPORT_MIMETYPES.get(fmt, 'text/csv'):
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# Record keys for each per-event export row, keyed by attendance_only
+EVENT_EXPORT_FIELDS = {
+    True: ('student_name', 'student_id', 'department', 'year', 'checkin_time'),
+    False: ('student_name', 'student_id', 'department', 'year', 'registration_time', 'status'),
+}
+
+def export_event_etag(event_id, event, fmt, attendance_only):
+    """ETag for an event export that changes whenever its rows could.
+
+    event comes from get_export_event, which carries the registration and
+    student state alongside the header.
+    """
+    key = repr((event_id, fmt, attendance_only, sorted(event.items())))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
 @app.route('/admin/export/event/<int:event_id>')
 def export_event_attendance(event_id):
     """Export attendance for a specific event"""
@@ -997,20 +1895,25 @@ def export_event_attendance(event_id):
 
     fmt = request.args.get('format', 'csv').lower()
     attendance_only = request.args.get('attendance_only', '0') == '1'
-    
+    return build_event_export(event_id, fmt, attendance_only)
+
+def build_event_export(event_id, fmt, attendance_only):
+    """Render an event export as a download response"""
     try:
         # Fetch event details
-        event = execute_query(
-            """SELECT title, TO_CHAR(date, 'DD-MM-YYYY') as event_date, 
-                      time, venue, organizer, capacity 
-               FROM events WHERE id = %s""",
-            (event_id,), fetch=True
-        )
+        event = get_export_event(event_id)
         
         if not event:
             flash('Event not found!', 'error')
             return redirect(url_for('admin_events'))
         
+        # Re-downloads of an unchanged export skip the query and rendering
+        etag = export_event_etag(event_id, event, fmt, attendance_only)
+        if etag and request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+        
         # Build query
         if attendance_only:
             query = """SELECT 
@@ -1038,79 +1941,89 @@ def export_event_attendance(event_id):
                 WHERE r.event_id = %s
                 ORDER BY r.registration_time DESC"""
         
-        records = execute_query(query, (event_id,), fetchall=True) or []
-        
-        if not records:
-            flash('No records found for this event!', 'warning')
-            return redirect(url_for('event_registrations', event_id=event_id))
-        
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         safe_title = "".join(c for c in event['title'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
         filename = f"{safe_title}_registrations_{timestamp}"
         
-        if fmt == 'csv':
-            return export_event_csv(records, event, filename, attendance_only)
-        elif fmt == 'excel':
-            return export_event_excel(records, event, filename, attendance_only)
-        elif fmt == 'pdf':
-            return export_event_pdf(records, event, filename, attendance_only)
+        if fmt not in ('excel', 'pdf', 'parquet', 'feather'):
+            response = export_event_csv_copy(query, event_id, event, filename, attendance_only)
         else:
-            return export_event_csv(records, event, filename, attendance_only)
+            rows = execute_query_iter(query, (event_id,))
+            first = next(rows, None)
+            
+            if first is None:
+                flash('No records found for this event!', 'warning')
+                return redirect(url_for('event_registrations', event_id=event_id))
+            
+            # Arrow formats stream straight from the cursor; Excel and PDF
+            # need every row
+            records = itertools.chain([first], rows)
+            
+            if fmt == 'excel':
+                response = export_event_excel(list(records), event, filename, attendance_only)
+            elif fmt == 'pdf':
+                response = export_event_pdf(list(records), event, filename, attendance_only)
+            else:
+                response = export_event_arrow(records, event, filename, attendance_only, fmt)
+        
+        return tag_export_response(response, etag, fmt)
             
     except Exception as e:
         flash(f'Export error: {str(e)}', 'error')
         return redirect(url_for('event_registrations', event_id=event_id))
 
+def event_csv_preamble(event, attendance_only):
+    """Event info and header rows that open an event CSV export"""
+    if attendance_only:
+        header = ['Student Name', 'Student ID', 'Department', 'Year', 'Check-in Time']
+    else:
+        header = ['Student Name', 'Student ID', 'Department', 'Year', 'Registration Time', 'Status']
+    return [
+        [f"Event: {event['title']}"],
+        [f"Date: {event['event_date']} | Time: {event['time']} | Venue: {event['venue']}"],
+        [f"Organizer: {event['organizer']} | Capacity: {event['capacity']}"],
+        [],
+        header,
+    ]
+
+def export_event_csv_copy(query, event_id, event, filename, attendance_only):
+    """Export event registrations to CSV written by Postgres through COPY"""
+    fields = ', '.join(EVENT_EXPORT_FIELDS[attendance_only])
+    output, count = copy_query_csv(f"SELECT {fields} FROM ({query}) export", (event_id,), header=False)
+    if output is None:
+        flash('CSV export error: could not read registrations', 'error')
+        return redirect(url_for('event_registrations', event_id=event_id))
+    if not count:
+        output.close()
+        flash('No records found for this event!', 'warning')
+        return redirect(url_for('event_registrations', event_id=event_id))
+    
+    # COPY ends lines with \n, so the surrounding rows do too
+    chunks = itertools.chain(
+        stream_csv(event_csv_preamble(event, attendance_only), lineterminator='\n'),
+        stream_file(output),
+        stream_csv([[], [f"Total Records: {count}"]], lineterminator='\n')
+    )
+    return csv_chunks_response(chunks, f"{filename}.csv")
+
 def export_event_csv(records, event, filename, attendance_only):
     """Export event registrations to CSV"""
     try:
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write event info
-        writer.writerow([f"Event: {event['title']}"])
-        writer.writerow([f"Date: {event['event_date']} | Time: {event['time']} | Venue: {event['venue']}"])
-        writer.writerow([f"Organizer: {event['organizer']} | Capacity: {event['capacity']}"])
-        writer.writerow([])
-        
-        # Write header
-        if attendance_only:
-            writer.writerow(['Student Name', 'Student ID', 'Department', 'Year', 'Check-in Time'])
-        else:
-            writer.writerow(['Student Name', 'Student ID', 'Department', 'Year', 'Registration Time', 'Status'])
-        
-        # Write data
-        for record in records:
-            if attendance_only:
-                writer.writerow([
-                    record.get('student_name', ''),
-                    record.get('student_id', ''),
-                    record.get('department', ''),
-                    record.get('year', ''),
-                    record.get('checkin_time', '')
-                ])
-            else:
-                writer.writerow([
-                    record.get('student_name', ''),
-                    record.get('student_id', ''),
-                    record.get('department', ''),
-                    record.get('year', ''),
-                    record.get('registration_time', ''),
-                    record.get('status', '')
-                ])
+        def rows():
+            yield from event_csv_preamble(event, attendance_only)
+            
+            # Data
+            count = 0
+            row_values = operator.itemgetter(*EVENT_EXPORT_FIELDS[attendance_only])
+            for record in records:
+                count += 1
+                yield row_values(record)
+            
+            # Summary
+            yield []
+            yield [f"Total Records: {count}"]
         
-        # Add summary
-        writer.writerow([])
-        writer.writerow([f"Total Records: {len(records)}"])
-        
-        response = Response(
-            output.getvalue(),
-            mimetype="text/csv",
-            headers={
-                "Content-Disposition": f"attachment;filename={filename}.csv"
-            }
-        )
-        return response
+        return csv_response(rows(), f"{filename}.csv")
         
     except Exception as e:
         flash(f'CSV export error: {str(e)}', 'error')
@@ -1120,85 +2033,51 @@ def export_event_excel(records, event, filename, attendance_only):
     """Export event registrations to Excel"""
     try:
         from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
         from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
         from openpyxl.utils import get_column_letter
         
-        # Create workbook
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Registrations"
+        # Write-only mode streams rows to disk instead of keeping every cell
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Registrations")
         
-        # Write event info
-        ws.merge_cells('A1:F1')
-        ws['A1'] = f"Event: {event['title']}"
-        ws['A1'].font = Font(bold=True, size=14)
-        ws['A1'].alignment = Alignment(horizontal='center')
+        if attendance_only:
+            headers = ['Student Name', 'Student ID', 'Department', 'Year', 'Check-in Time']
+        else:
+            headers = ['Student Name', 'Student ID', 'Department', 'Year', 'Registration Time', 'Status']
+        
+        event_info = [
+            f"Event: {event['title']}",
+            f"Date: {event['event_date']} | Time: {event['time']} | Venue: {event['venue']}",
+            f"Organizer: {event['organizer']} | Capacity: {event['capacity']}",
+        ]
+        
+        row_values = operator.itemgetter(*EVENT_EXPORT_FIELDS[attendance_only])
+        rows = [row_values(record) for record in records]
         
-        ws.merge_cells('A2:F2')
-        ws['A2'] = f"Date: {event['event_date']} | Time: {event['time']} | Venue: {event['venue']}"
-        ws['A2'].alignment = Alignment(horizontal='center')
+        # Column widths have to be set before any row is written
+        widths = [max(len(str(value)) for value in column)
+                  for column in zip(headers, *rows)]
+        widths[0] = max(widths[0], *map(len, event_info))
+        for col, width in enumerate(widths, start=1):
+            ws.column_dimensions[get_column_letter(col)].width = min(width + 2, 50)
         
-        ws.merge_cells('A3:F3')
-        ws['A3'] = f"Organizer: {event['organizer']} | Capacity: {event['capacity']}"
-        ws['A3'].alignment = Alignment(horizontal='center')
+        # Write event info
+        for row_num, text in enumerate(event_info, start=1):
+            ws.merged_cells.add(f'A{row_num}:F{row_num}')
+            cell = WriteOnlyCell(ws, value=text)
+            cell.alignment = Alignment(horizontal='center')
+            if row_num == 1:
+                cell.font = Font(bold=True, size=14)
+            ws.append([cell])
         
         # Empty row
         ws.append([])
         
         # Write header row
-        if attendance_only:
-            headers = ['Student Name', 'Student ID', 'Department', 'Year', 'Check-in Time']
-        else:
-            headers = ['Student Name', 'Student ID', 'Department', 'Year', 'Registration Time', 'Status']
-        
-        ws.append(headers)
-        
-        # Style header
         header_fill = PatternFill(start_color='2c3e50', end_color='2c3e50', fill_type='solid')
         header_font = Font(color='FFFFFF', bold=True)
         header_alignment = Alignment(horizontal='center', vertical='center')
-        
-        for col in range(1, len(headers) + 1):
-            cell = ws.cell(row=5, column=col)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-        
-        # Write data
-        for record in records:
-            if attendance_only:
-                row = [
-                    record.get('student_name', ''),
-                    record.get('student_id', ''),
-                    record.get('department', ''),
-                    record.get('year', ''),
-                    record.get('checkin_time', '')
-                ]
-            else:
-                row = [
-                    record.get('student_name', ''),
-                    record.get('student_id', ''),
-                    record.get('department', ''),
-                    record.get('year', ''),
-                    record.get('registration_time', ''),
-                    record.get('status', '')
-                ]
-            ws.append(row)
-        
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Add border to data
         thin_border = Border(
             left=Side(style='thin'),
             right=Side(style='thin'),
@@ -1206,16 +2085,34 @@ def export_event_excel(records, event, filename, attendance_only):
             bottom=Side(style='thin')
         )
         
-        for row in ws.iter_rows(min_row=5, max_row=ws.max_row, min_col=1, max_col=len(headers)):
-            for cell in row:
-                cell.border = thin_border
+        header_cells = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.fill = header_fill
+            cell.font = header_font
+            cell.alignment = header_alignment
+            cell.border = thin_border
+            header_cells.append(cell)
+        ws.append(header_cells)
+        
+        # Write data with borders; copying a styled cell's style skips
+        # re-hashing the Border for every cell
+        bordered = WriteOnlyCell(ws)
+        bordered.border = thin_border
+        for values in rows:
+            cells = []
+            for value in values:
+                cell = WriteOnlyCell(ws, value=value)
+                cell._style = copy.copy(bordered._style)
+                cells.append(cell)
+            ws.append(cells)
         
         # Add summary
-        ws.append([])
-        summary_row = ws.max_row + 1
-        ws.merge_cells(f'A{summary_row}:C{summary_row}')
-        ws[f'A{summary_row}'] = f"Total Records: {len(records)}"
-        ws[f'A{summary_row}'].font = Font(bold=True)
+        summary_row = len(event_info) + len(rows) + 3
+        ws.merged_cells.add(f'A{summary_row}:C{summary_row}')
+        summary = WriteOnlyCell(ws, value=f"Total Records: {len(rows)}")
+        summary.font = Font(bold=True)
+        ws.append([summary])
         
         # Save to BytesIO
         output = BytesIO()
@@ -1240,11 +2137,6 @@ def export_event_pdf(records, event, filename, attendance_only):
         return export_event_csv(records, event, filename, attendance_only)
     
     try:
-        from reportlab.lib import colors
-        from reportlab.lib.pagesizes import letter, landscape
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-        from reportlab.lib.styles import getSampleStyleSheet
-        
         # Create PDF buffer
         pdf_buffer = BytesIO()
         
@@ -1259,7 +2151,7 @@ def export_event_pdf(records, event, filename, attendance_only):
         )
         
         elements = []
-        styles = getSampleStyleSheet()
+        styles = PDF_STYLES
         
         # Add event title
         title = Paragraph(f"<b>Event: {event['title']}</b>", styles['Heading2'])
@@ -1278,57 +2170,17 @@ def export_event_pdf(records, event, filename, attendance_only):
         # Prepare table data
         if records:
             if attendance_only:
-                table_data = [['Student Name', 'Student ID', 'Department', 'Year', 'Check-in Time']]
+                headers = ['Student Name', 'Student ID', 'Department', 'Year', 'Check-in Time']
                 col_widths = [120, 80, 80, 40, 100]
             else:
-                table_data = [['Student Name', 'Student ID', 'Department', 'Year', 'Registration Time', 'Status']]
+                headers = ['Student Name', 'Student ID', 'Department', 'Year', 'Registration Time', 'Status']
                 col_widths = [120, 80, 80, 40, 100, 60]
             
-            for record in records:
-                if attendance_only:
-                    table_data.append([
-                        record.get('student_name', ''),
-                        record.get('student_id', ''),
-                        record.get('department', ''),
-                        record.get('year', ''),
-                        record.get('checkin_time', '')
-                    ])
-                else:
-                    table_data.append([
-                        record.get('student_name', ''),
-                        record.get('student_id', ''),
-                        record.get('department', ''),
-                        record.get('year', ''),
-                        record.get('registration_time', ''),
-                        record.get('status', '')
-                    ])
-            
-            # Create table
-            table = Table(table_data, colWidths=col_widths, repeatRows=1)
-            
-            # Style table
-            table.setStyle(TableStyle([
-                # Header
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 9),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-                ('TOPPADDING', (0, 0), (-1, 0), 10),
-                
-                # Data rows
-                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-                ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ('ROWHEIGHTS', (0, 0), (-1, -1), 25),
-            ]))
+            row_values = operator.itemgetter(*EVENT_EXPORT_FIELDS[attendance_only])
+            table_data = [list(row_values(record)) for record in records]
             
-            elements.append(table)
+            # Create tables
+            elements.extend(pdf_table_blocks(headers, table_data, EVENT_PDF_TABLE_STYLE, col_widths))
         else:
             elements.append(Paragraph("<i>No records found</i>", styles['Italic']))
         
@@ -1360,6 +2212,222 @@ def export_event_pdf(records, event, filename, attendance_only):
         flash(f'PDF export error: {str(e)}', 'error')
         return export_event_csv(records, event, filename, attendance_only)
 
+def export_event_arrow(records, event, filename, attendance_only, fmt):
+    """Export event registrations as Parquet or Feather for analytics tools"""
+    if not PYARROW_AVAILABLE:
+        flash(f'{fmt.title()} export requires the pyarrow library', 'warning')
+        return export_event_csv(records, event, filename, attendance_only)
+    
+    try:
+        return arrow_response(records, fmt, f"{filename}.{fmt}")
+        
+    except Exception as e:
+        flash(f'{fmt.title()} export error: {str(e)}', 'error')
+        return export_event_csv(records, event, filename, attendance_only)
+
+# -----------------------
+# Background Export Jobs
+# -----------------------
+# Large exports render in a child process so the request returns straight
+# away; these threads only wait for it. The files live on local disk, shared
+# by the workers of one instance
+EXPORT_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix='export')
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), 'college_event_exports')
+# Seconds a job may stay pending, queueing included, before it counts as
+# failed; covers renders orphaned by a worker restart
+EXPORT_JOB_TIMEOUT = 600
+
+def purge_expired_export_jobs():
+    """Delete expired export jobs and their files"""
+    expired = execute_query(
+        "DELETE FROM export_jobs WHERE expires_at <= NOW() RETURNING path",
+        fetchall=True
+    ) or []
+    for job in expired:
+        if job['path'] and os.path.exists(job['path']):
+            os.remove(job['path'])
+
+def fail_stale_export_jobs():
+    """Mark jobs pending for longer than EXPORT_JOB_TIMEOUT as failed"""
+    execute_query(
+        """UPDATE export_jobs SET status = 'failed', message = 'Export timed out'
+           WHERE status = 'pending' AND created_at <= NOW() - %s * INTERVAL '1 second'""",
+        (EXPORT_JOB_TIMEOUT,)
+    )
+
+def run_export_job(job_id, event_id, fmt, attendance_only):
+    """Render an export to disk and record the result on its job row"""
+    try:
+        with app.test_request_context():
+            response = build_event_export(event_id, fmt, attendance_only)
+            messages = get_flashed_messages()
+            
+            # A renderer that failed falls back to CSV with a flash; that is
+            # not the file the admin asked for, so the job fails instead
+            if (response.status_code != 200
+                    or response.mimetype != EXPORT_MIMETYPES.get(fmt, 'text/csv')):
+                response.close()
+                execute_query(
+                    "UPDATE export_jobs SET status = 'failed', message = %s WHERE id = %s",
+                    (messages[-1] if messages else 'Export failed', job_id)
+                )
+                return
+            
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            path = os.path.join(EXPORT_DIR, f"export_{job_id}")
+            digest = hashlib.sha256()
+            response.direct_passthrough = False
+            with open(path, 'wb') as f:
+                for chunk in response.iter_encoded():
+                    digest.update(chunk)
+                    f.write(chunk)
+            response.close()
+            
+            _, options = parse_options_header(response.headers.get('Content-Disposition', ''))
+            execute_query(
+                """UPDATE export_jobs
+                   SET status = 'ready', path = %s, download_name = %s, mimetype = %s, sha256 = %s
+                   WHERE id = %s""",
+                (path, options.get('filename', f"export_{job_id}"), response.mimetype,
+                 digest.hexdigest(), job_id)
+            )
+    except Exception as e:
+        print(f"❌ Export job {job_id} failed: {e}")
+        execute_query(
+            "UPDATE export_jobs SET status = 'failed', message = %s WHERE id = %s",
+            (str(e), job_id)
+        )
+
+def spawn_export_job(job_id):
+    """Render an export job in a `flask run-export-job` child process.
+
+    Rendering is CPU-bound. Under gevent a thread here is a greenlet and would
+    stall the worker's other requests, and the hub's OS threads cannot share
+    the connection pool's greenlet locks, so the render gets its own process.
+    """
+    env = dict(os.environ, RUN_DB_INIT='0', PG_POOL_MIN='1')
+    command = [sys.executable, '-m', 'flask', '--app', os.path.abspath(__file__),
+               'run-export-job', str(job_id)]
+    try:
+        returncode = subprocess.run(command, env=env, timeout=EXPORT_JOB_TIMEOUT).returncode
+        message = f'Export process exited with status {returncode}'
+    except subprocess.TimeoutExpired:
+        returncode = None
+        message = 'Export timed out'
+    except OSError as e:
+        returncode = None
+        message = str(e)
+    if returncode != 0:
+        print(f"❌ Export job {job_id} failed: {message}")
+        execute_query(
+            "UPDATE export_jobs SET status = 'failed', message = %s WHERE id = %s AND status = 'pending'",
+            (message, job_id)
+        )
+
+@app.cli.command('run-export-job')
+@click.argument('job_id', type=int)
+def run_export_job_command(job_id):
+    """Render a queued export job to disk"""
+    job = execute_query(
+        "SELECT event_id, format, attendance_only FROM export_jobs WHERE id = %s AND status = 'pending'",
+        (job_id,), fetch=True
+    )
+    if not job:
+        raise click.ClickException(f'No pending export job {job_id}')
+    run_export_job(job_id, job['event_id'], job['format'], job['attendance_only'])
+
+@app.route('/admin/export/event/<int:event_id>/job', methods=['POST'])
+def start_event_export_job(event_id):
+    """Queue an event export and return where to poll for it"""
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    fmt = request.args.get('format', 'csv').lower()
+    attendance_only = request.args.get('attendance_only', '0') == '1'
+    
+    event = get_export_event(event_id)
+    if not event:
+        return jsonify({'success': False, 'message': 'Event not found'}), 404
+    
+    purge_expired_export_jobs()
+    fail_stale_export_jobs()
+    
+    # An unchanged export reuses the admin's queued or finished job
+    etag = export_event_etag(event_id, event, fmt, attendance_only)
+    job = None
+    if etag:
+        job = execute_query(
+            """SELECT id, status FROM export_jobs
+               WHERE admin_id = %s AND event_id = %s AND format = %s
+                 AND attendance_only = %s AND etag = %s
+                 AND status IN ('pending', 'ready') AND expires_at > NOW()
+               ORDER BY id DESC LIMIT 1""",
+            (session['admin_id'], event_id, fmt, attendance_only, etag),
+            fetch=True
+        )
+    
+    if not job:
+        job = execute_query(
+            """INSERT INTO export_jobs (admin_id, event_id, format, attendance_only, etag)
+               SELECT %s, id, %s, %s, %s FROM events WHERE id = %s
+               RETURNING id, status""",
+            (session['admin_id'], fmt, attendance_only, etag, event_id),
+            fetch=True
+        )
+        if not job:
+            return jsonify({'success': False, 'message': 'Event not found'}), 404
+        EXPORT_POOL.submit(spawn_export_job, job['id'])
+    
+    return jsonify({
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': url_for('export_job_status', job_id=job['id'])
+    }), 202
+
+@app.route('/admin/export/jobs/<int:job_id>')
+def export_job_status(job_id):
+    """Report whether a queued export is ready to download"""
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    fail_stale_export_jobs()
+    job = execute_query(
+        """SELECT status, message FROM export_jobs
+           WHERE id = %s AND admin_id = %s AND expires_at > NOW()""",
+        (job_id, session['admin_id']), fetch=True
+    )
+    if not job:
+        return jsonify({'success': False, 'message': 'Export not found'}), 404
+    
+    result = {'success': True, 'status': job['status']}
+    if job['status'] == 'ready':
+        result['download_url'] = url_for('download_export_job', job_id=job_id)
+    elif job['status'] == 'failed':
+        result['message'] = job['message']
+    return jsonify(result)
+
+@app.route('/admin/export/jobs/<int:job_id>/download')
+def download_export_job(job_id):
+    """Send a finished background export"""
+    if 'admin_id' not in session:
+        return redirect(url_for('admin_login'))
+    
+    job = execute_query(
+        """SELECT path, download_name, mimetype FROM export_jobs
+           WHERE id = %s AND admin_id = %s AND status = 'ready' AND expires_at > NOW()""",
+        (job_id, session['admin_id']), fetch=True
+    )
+    if not job or not os.path.exists(job['path']):
+        abort(404)
+    
+    return send_file(
+        job['path'],
+        as_attachment=True,
+        download_name=job['download_name'],
+        mimetype=job['mimetype']
+    )
+
 # -----------------------
 # Mark Attendance AJAX Endpoint
 # -----------------------
@@ -1375,98 +2443,115 @@ def mark_attendance():
         event_id = data.get('event_id')
         attended = data.get('attended', False)
         
-        # Get student by student_id (not id)
+        # Look up the student and update their registration in one statement
         student = execute_query(
-            "SELECT id FROM students WHERE student_id = %s",
-            (student_id,), fetch=True
+            """WITH student AS (
+                   SELECT id FROM students WHERE student_id = %s
+               ), updated AS (
+                   UPDATE registrations
+                   SET attended = %s,
+                       checkin_time = CASE WHEN %s THEN NOW() END
+                   WHERE student_id = (SELECT id FROM student) AND event_id = %s
+               )
+               SELECT id FROM student""",
+            (student_id, bool(attended), bool(attended), event_id),
+            fetch=True, read_only=False
         )
         
         if not student:
             return jsonify({'success': False, 'message': 'Student not found'})
         
-        # Update attendance
-        if attended:
-            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            execute_query(
-                "UPDATE registrations SET attended = TRUE, checkin_time = %s "
-                "WHERE student_id = %s AND event_id = %s",
-                (current_time, student['id'], event_id)
-            )
-        else:
-            execute_query(
-                "UPDATE registrations SET attended = FALSE, checkin_time = NULL "
-                "WHERE student_id = %s AND event_id = %s",
-                (student['id'], event_id)
-            )
-        
+        invalidate_admin_dashboard()
         return jsonify({'success': True, 'message': 'Attendance updated'})
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error: {str(e)}'})
 
+@app.route('/admin/mark_attendance_bulk', methods=['POST'])
+def mark_attendance_bulk():
+    """AJAX endpoint to mark attendance for many students in one UPDATE"""
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    try:
+        data = request.json
+        event_id = data.get('event_id')
+        student_ids = [str(sid) for sid in data.get('student_ids') or []]
+        attended = bool(data.get('attended', False))
+        
+        if not student_ids:
+            return jsonify({'success': False, 'message': 'No students given'})
+        
+        updated = execute_query(
+            """UPDATE registrations r
+               SET attended = %s,
+                   checkin_time = CASE WHEN %s THEN NOW() END
+               FROM students s
+               WHERE r.student_id = s.id AND r.event_id = %s AND s.student_id = ANY(%s)
+               RETURNING s.student_id""",
+            (attended, attended, event_id, student_ids),
+            fetchall=True
+        )
+        if updated is None:
+            return jsonify({'success': False, 'message': 'Error updating attendance'})
+        
+        marked = {row['student_id'] for row in updated}
+        invalidate_admin_dashboard()
+        return jsonify({
+            'success': True,
+            'message': f'Attendance updated for {len(marked)} student(s)',
+            'updated': len(marked),
+            'not_found': [sid for sid in student_ids if sid not in marked]
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
 def export_csv(records, filename):
     """Export records to CSV format"""
     try:
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow([
+        headers = [
             'Student Name', 'Student ID', 'Department', 'Year',
             'Event Title', 'Event Date', 'Event Time', 'Venue',
             'Registration Time', 'Check-in Time'
-        ])
-        
-        # Write data
-        for record in records:
-            writer.writerow([
-                record.get('student_name', ''),
-                record.get('student_id', ''),
-                record.get('department', ''),
-                record.get('year', ''),
-                record.get('event_title', ''),
-                record.get('event_date', ''),
-                record.get('event_time', ''),
-                record.get('venue', ''),
-                record.get('registration_time', ''),
-                record.get('checkin_time', '')
-            ])
-        
-        # Create response
-        response = Response(
-            output.getvalue(),
-            mimetype="text/csv",
-            headers={
-                "Content-Disposition": f"attachment;filename={filename}.csv",
-                "Content-Type": "text/csv; charset=utf-8"
-            }
+        ]
+        fields = ('student_name', 'student_id', 'department', 'year',
+                  'event_title', 'event_date', 'event_time', 'venue',
+                  'registration_time', 'checkin_time')
+        
+        # Rows go straight from the records to the CSV stream
+        csv_rows = itertools.chain(
+            [headers],
+            ([record.get(field, '') for field in fields] for record in records)
         )
-        return response
+        return csv_response(csv_rows, f"{filename}.csv")
         
     except Exception as e:
         flash(f'CSV export error: {str(e)}', 'error')
         return redirect(url_for('admin_dashboard'))
 
+# Attendance record column -> export heading for export_excel
+ATTENDANCE_EXPORT_COLUMNS = {
+    'student_name': 'Student Name',
+    'student_id': 'Student ID',
+    'department': 'Department',
+    'year': 'Year',
+    'event_title': 'Event Title',
+    'event_date': 'Event Date',
+    'event_time': 'Event Time',
+    'venue': 'Venue',
+    'registration_time': 'Registration Time',
+    'checkin_time': 'Check-in Time',
+}
+
 def export_excel(records, filename):
     """Export records to Excel format"""
     try:
-        # Prepare data for DataFrame
-        data = []
-        for record in records:
-            data.append({
-                'Student Name': record.get('student_name', ''),
-                'Student ID': record.get('student_id', ''),
-                'Department': record.get('department', ''),
-                'Year': record.get('year', ''),
-                'Event Title': record.get('event_title', ''),
-                'Event Date': record.get('event_date', ''),
-                'Event Time': str(record.get('event_time', '')),
-                'Venue': record.get('venue', ''),
-                'Registration Time': record.get('registration_time', ''),
-                'Check-in Time': record.get('checkin_time', '')
-            })
-        
-        df = pd.DataFrame(data)
+        df = pd.DataFrame.from_records(
+            records, columns=list(ATTENDANCE_EXPORT_COLUMNS)
+        ).rename(columns=ATTENDANCE_EXPORT_COLUMNS)
+        df = df.astype(object).where(df.notna(), '')
+        df['Event Time'] = df['Event Time'].astype(str)
         
         # Create Excel in memory
         output = BytesIO()
@@ -1507,11 +2592,6 @@ def export_pdf(records, filename):
         return export_csv(records, filename)
     
     try:
-        from reportlab.lib import colors
-        from reportlab.lib.pagesizes import landscape, A4
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-        from reportlab.lib.styles import getSampleStyleSheet
-        
         # Create PDF in memory
         pdf_buffer = BytesIO()
         
@@ -1526,7 +2606,7 @@ def export_pdf(records, filename):
         )
         
         elements = []
-        styles = getSampleStyleSheet()
+        styles = PDF_STYLES
         
         # Add title
         title = Paragraph(f"<b>Attendance Report</b><br/>Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}", 
@@ -1563,32 +2643,7 @@ def export_pdf(records, filename):
         table = Table(table_data, colWidths=col_widths, repeatRows=1)
         
         # Apply table styles
-        table.setStyle(TableStyle([
-            # Header style
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-            
-            # Data rows style
-            ('BACKGROUND', (0, 1), (-1, -2), colors.white),
-            ('TEXTCOLOR', (0, 1), (-1, -2), colors.black),
-            ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -2), 8),
-            ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            
-            # Grid lines
-            ('GRID', (0, 0), (-1, -2), 0.5, colors.grey),
-            
-            # Summary row style
-            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#ecf0f1')),
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, -1), (-1, -1), 9),
-            ('ALIGN', (0, -1), (-1, -1), 'LEFT'),
-        ]))
+        table.setStyle(SUMMARY_PDF_TABLE_STYLE)
         
         elements.append(table)
         elements.append(Spacer(1, 20))
@@ -1616,16 +2671,28 @@ def debug_db():
     try:
         database_url = os.environ.get('DATABASE_URL', 'Not set')
         
+        # Counts and both recent lists in a single round trip
+        snapshot = execute_query(
+            """SELECT (SELECT COUNT(*) FROM students) AS students,
+                      (SELECT COUNT(*) FROM events) AS events,
+                      (SELECT COUNT(*) FROM registrations) AS registrations,
+                      (SELECT COUNT(*) FROM staff) AS staff,
+                      (SELECT COUNT(*) FROM admins) AS admins,
+                      (SELECT json_agg(s) FROM (
+                           SELECT student_id, name FROM students ORDER BY id DESC LIMIT 5
+                       ) s) AS recent_students,
+                      (SELECT json_agg(e) FROM (
+                           SELECT title, date FROM events ORDER BY id DESC LIMIT 5
+                       ) e) AS recent_events""",
+            fetch=True
+        ) or {}
+        
         tables = {
-            'students': execute_query("SELECT COUNT(*) as count FROM students", fetch=True),
-            'events': execute_query("SELECT COUNT(*) as count FROM events", fetch=True),
-            'registrations': execute_query("SELECT COUNT(*) as count FROM registrations", fetch=True),
-            'staff': execute_query("SELECT COUNT(*) as count FROM staff", fetch=True),
-            'admins': execute_query("SELECT COUNT(*) as count FROM admins", fetch=True)
+            name: {'count': snapshot[name]} if name in snapshot else None
+            for name in ('students', 'events', 'registrations', 'staff', 'admins')
         }
-        
-        recent_students = execute_query("SELECT student_id, name FROM students ORDER BY id DESC LIMIT 5", fetchall=True) or []
-        recent_events = execute_query("SELECT title, date FROM events ORDER BY id DESC LIMIT 5", fetchall=True) or []
+        recent_students = snapshot.get('recent_students') or []
+        recent_events = snapshot.get('recent_events') or []
         
         return render_template('debug_db.html',
                              database_url=database_url,
@@ -1639,28 +2706,62 @@ def debug_db():
 # -----------------------
 # Export helpers
 # -----------------------
+# Registration column -> export heading for make_dataframe_from_regs
+REGISTRATION_EXPORT_COLUMNS = {
+    'name': 'Student Name',
+    'student_id': 'Student ID',
+    'department': 'Department',
+    'year': 'Year',
+    'registration_time': 'Registration Time',
+    'attended': 'Attended',
+    'checkin_time': 'Check-in Time',
+}
+
 def make_dataframe_from_regs(regs):
     """Return a pandas DataFrame from registration records."""
-    rows = []
-    for r in regs:
-        rows.append({
-            'Student Name': r.get('name', ''),
-            'Student ID': r.get('student_id', ''),
-            'Department': r.get('department', ''),
-            'Year': r.get('year', ''),
-            'Registration Time': r.get('registration_time', ''),
-            'Attended': 'Yes' if r.get('attended') else 'No',
-            'Check-in Time': r.get('checkin_time', '') if r.get('checkin_time') else ''
+    df = pd.DataFrame.from_records(
+        regs, columns=list(REGISTRATION_EXPORT_COLUMNS)
+    ).rename(columns=REGISTRATION_EXPORT_COLUMNS)
+    df['Attended'] = np.where(df['Attended'].eq(True), 'Yes', 'No')
+    return df.astype(object).where(df.notna(), '')
+
+def records_to_excel_file(headers, rows, sheet_name='Sheet1'):
+    """Write an iterable of row tuples to a spooled .xlsx file.
+
+    xlsxwriter's constant_memory mode flushes each row as it is written, so
+    rows can come straight from a server-side cursor without being collected.
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=COPY_SPOOL_SIZE)
+    if XLSXWRITER_AVAILABLE:
+        workbook = xlsxwriter.Workbook(output, {
+            'constant_memory': True,
+            'nan_inf_to_errors': True,
+            'default_date_format': 'yyyy-mm-dd hh:mm',
         })
-    return pd.DataFrame(rows)
-
-def dataframe_to_excel_bytes(df, sheet_name='Sheet1'):
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
+        worksheet = workbook.add_worksheet(sheet_name)
+        worksheet.write_row(0, 0, headers)
+        for row_num, row in enumerate(rows, start=1):
+            worksheet.write_row(row_num, 0, row)
+        workbook.close()
+    else:
+        # openpyxl's write-only mode streams rows instead of keeping a Cell each
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet(sheet_name)
+        worksheet.append(headers)
+        for row in rows:
+            worksheet.append(row)
+        workbook.save(output)
     output.seek(0)
     return output
 
+def dataframe_to_excel_bytes(df, sheet_name='Sheet1'):
+    """Write df to a spooled .xlsx file"""
+    values = df.astype(object).where(df.notna(), None)
+    return records_to_excel_file(
+        list(df.columns), values.itertuples(index=False, name=None), sheet_name
+    )
+
 def dataframe_to_pdf_bytes(df, title='Export'):
     if not REPORTLAB_AVAILABLE:
         raise ImportError("reportlab not installed")
@@ -1670,30 +2771,129 @@ def dataframe_to_pdf_bytes(df, title='Export'):
                             leftMargin=15, rightMargin=15,
                             topMargin=20, bottomMargin=20)
 
-    styles = getSampleStyleSheet()
+    styles = PDF_STYLES
     elements = [Paragraph(title, styles['Heading2']), Spacer(1, 12)]
 
-    # Convert DataFrame to list of lists
-    data = [list(df.columns)]
-    for _, row in df.iterrows():
-        data.append([str(x) if not pd.isna(x) else '' for x in row])
-
-    table = Table(data, repeatRows=1)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c7be5')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('GRID', (0, 0), (-1, -1), 0.3, colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTSIZE', (0, 0), (-1, -1), 7),
-    ]))
+    # Convert DataFrame to list of lists, stringifying whole columns at once
+    cells = df.astype(object).where(df.notna(), '').astype(str)
+    data = cells.values.tolist()
 
-    elements.append(table)
+    elements.extend(pdf_table_blocks(list(df.columns), data, DATAFRAME_PDF_TABLE_STYLE))
     doc.build(elements)
 
     output.seek(0)
     return output
 
+# Bytes of CSV buffered before each chunk is sent to the client
+CSV_CHUNK_SIZE = 64 * 1024
+
+def stream_csv(rows, lineterminator='\r\n'):
+    """Yield rows as UTF-8 CSV in chunks, never holding the whole file"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator=lineterminator)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CSV_CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+# Fast gzip level: CSV compresses well even at 1, and CPU stays cheap
+CSV_GZIP_LEVEL = 1
+
+def gzip_chunks(chunks, level=CSV_GZIP_LEVEL):
+    """Gzip a stream of byte chunks as they are produced"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def stream_file(f, chunk_size=CSV_CHUNK_SIZE):
+    """Yield a binary file's contents in chunks, closing it afterwards"""
+    with f:
+        yield from iter(lambda: f.read(chunk_size), b'')
+
+def csv_response(rows, filename):
+    """Stream rows to the client as a CSV attachment, gzipped if accepted"""
+    return csv_chunks_response(stream_csv(rows), filename)
+
+def csv_chunks_response(chunks, filename):
+    """Stream encoded CSV chunks to the client, gzipped if accepted"""
+    headers = {
+        "Content-Disposition": f"attachment;filename={filename}",
+        "Vary": "Accept-Encoding"
+    }
+    if request.accept_encodings.best_match(['gzip']):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    
+    return Response(
+        stream_with_context(chunks),
+        mimetype="text/csv",
+        headers=headers
+    )
+
+ARROW_BATCH_ROWS = 5000
+
+class ChunkSink:
+    """Write-only file object whose written bytes are drained by a generator"""
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self.position
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        self.closed = True
+    
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def stream_arrow(records, fmt, batch_size=ARROW_BATCH_ROWS):
+    """Yield a Parquet or Feather file built batch_size row dicts at a time"""
+    sink = ChunkSink()
+    writer = None
+    schema = None
+    for batch in iter(lambda: list(itertools.islice(records, batch_size)), []):
+        if writer is None:
+            # Columns that are all NULL in the first batch are text columns
+            schema = pa.Table.from_pylist(batch).schema
+            schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                                for field in schema])
+            if fmt == 'parquet':
+                writer = pq.ParquetWriter(sink, schema, compression='zstd')
+            else:
+                writer = pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(compression='lz4'))
+        writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+def arrow_response(records, fmt, filename):
+    """Stream row dicts to the client as a Parquet or Feather attachment"""
+    return Response(
+        stream_with_context(stream_arrow(records, fmt)),
+        mimetype=EXPORT_MIMETYPES[fmt],
+        headers={"Content-Disposition": f"attachment;filename={filename}"}
+    )
+
 def dataframe_to_csv_bytes(df):
     output = io.StringIO()
     df.to_csv(output, index=False, encoding='utf-8')
@@ -1,6 +1,7 @@
 # init_db.py
 import os
 import psycopg2
+from werkzeug.security import generate_password_hash
 
 def init_postgresql_tables():
     """Initialize all tables in PostgreSQL"""
@@ -26,7 +27,7 @@ def init_postgresql_tables():
                 student_id VARCHAR(50) UNIQUE NOT NULL,
                 name VARCHAR(100) NOT NULL,
                 email VARCHAR(100) UNIQUE NOT NULL,
-                password VARCHAR(100) NOT NULL,
+                password VARCHAR(255) NOT NULL,
                 department VARCHAR(100),
                 year VARCHAR(10),
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -45,6 +46,7 @@ def init_postgresql_tables():
                 organizer VARCHAR(100),
                 capacity INTEGER,
                 registered_count INTEGER DEFAULT 0,
+                attended_count INTEGER DEFAULT 0,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
@@ -56,7 +58,6 @@ def init_postgresql_tables():
                 student_id INTEGER REFERENCES students(id) ON DELETE CASCADE,
                 event_id INTEGER REFERENCES events(id) ON DELETE CASCADE,
                 registration_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                qr_code_path VARCHAR(500),
                 checkin_time TIMESTAMP,
                 attended BOOLEAN DEFAULT FALSE,
                 UNIQUE(student_id, event_id)
@@ -68,7 +69,7 @@ def init_postgresql_tables():
             CREATE TABLE IF NOT EXISTS staff (
                 id SERIAL PRIMARY KEY,
                 username VARCHAR(50) UNIQUE NOT NULL,
-                password VARCHAR(100) NOT NULL,
+                password VARCHAR(255) NOT NULL,
                 name VARCHAR(100) NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
@@ -79,7 +80,7 @@ def init_postgresql_tables():
             CREATE TABLE IF NOT EXISTS admins (
                 id SERIAL PRIMARY KEY,
                 username VARCHAR(50) UNIQUE NOT NULL,
-                password VARCHAR(100) NOT NULL,
+                password VARCHAR(255) NOT NULL,
                 name VARCHAR(100) NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
@@ -89,16 +90,16 @@ def init_postgresql_tables():
         # Insert default admin
         cursor.execute("""
             INSERT INTO admins (username, password, name) 
-            VALUES ('admin', 'admin123', 'System Administrator')
+            VALUES ('admin', %s, 'System Administrator')
             ON CONFLICT (username) DO NOTHING
-        """)
+        """, (generate_password_hash('admin123'),))
         
         # Insert default staff
         cursor.execute("""
             INSERT INTO staff (username, password, name) 
-            VALUES ('staff', 'staff123', 'Event Staff')
+            VALUES ('staff', %s, 'Event Staff')
             ON CONFLICT (username) DO NOTHING
-        """)
+        """, (generate_password_hash('staff123'),))
         
         conn.commit()
         cursor.close()
@@ -0,0 +1,105 @@
+"""ETag and 304 handling for pages and exports; needs no database.
+
+    python -m unittest tests.test_conditional
+"""
+import os
+import unittest
+
+os.environ.setdefault('RUN_DB_INIT', '0')
+import app
+
+from flask import Response, session
+
+
+class ConditionalPageTests(unittest.TestCase):
+
+    def setUp(self):
+        self.renders = 0
+
+    def render(self):
+        self.renders += 1
+        return 'page'
+
+    def request(self, **headers):
+        return app.app.test_request_context('/', headers=headers)
+
+    def test_renders_and_tags_without_if_none_match(self):
+        with self.request():
+            response = app.conditional_page('abc', self.render)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['ETag'], 'W/"abc"')
+        self.assertEqual(response.headers['Cache-Control'], 'private, no-cache')
+        self.assertEqual(self.renders, 1)
+
+    def test_matching_tag_answers_304_without_rendering(self):
+        with self.request(**{'If-None-Match': 'W/"abc"'}):
+            response = app.conditional_page('abc', self.render)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], 'W/"abc"')
+        self.assertEqual(self.renders, 0)
+
+    def test_strong_form_of_the_tag_also_matches(self):
+        with self.request(**{'If-None-Match': '"abc"'}):
+            response = app.conditional_page('abc', self.render)
+        self.assertEqual(response.status_code, 304)
+
+    def test_stale_tag_renders(self):
+        with self.request(**{'If-None-Match': 'W/"old"'}):
+            response = app.conditional_page('abc', self.render)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.renders, 1)
+
+    def test_pending_flash_always_renders(self):
+        with self.request(**{'If-None-Match': 'W/"abc"'}):
+            session['_flashes'] = [('success', 'Saved')]
+            response = app.conditional_page('abc', self.render)
+        self.assertEqual(response.status_code, 200)
+
+    def test_no_etag_renders_untagged(self):
+        with self.request(**{'If-None-Match': 'W/"abc"'}):
+            response = app.conditional_page(None, self.render)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response.headers)
+
+    def test_page_etag_depends_on_the_viewer(self):
+        with self.request():
+            session['student_id'] = 1
+            first = app.page_etag('dashboard', 'digest')
+        with self.request():
+            session['student_id'] = 2
+            second = app.page_etag('dashboard', 'digest')
+        self.assertNotEqual(first, second)
+
+
+class TagExportResponseTests(unittest.TestCase):
+
+    def test_tags_the_requested_format(self):
+        response = Response(b'%PDF', mimetype=app.EXPORT_MIMETYPES['pdf'])
+        response = app.tag_export_response(response, 'abc', 'pdf')
+        self.assertEqual(response.headers['ETag'], 'W/"abc"')
+        self.assertEqual(response.headers['Cache-Control'], 'private, no-cache')
+
+    def test_csv_fallback_is_not_tagged(self):
+        response = Response(b'a,b\r\n', mimetype='text/csv')
+        response = app.tag_export_response(response, 'abc', 'excel')
+        self.assertNotIn('ETag', response.headers)
+
+    def test_redirect_is_not_tagged(self):
+        response = Response(status=302, headers={'Location': '/admin/events'})
+        response = app.tag_export_response(response, 'abc', 'pdf')
+        self.assertNotIn('ETag', response.headers)
+
+    def test_unknown_format_is_treated_as_csv(self):
+        response = Response(b'a,b\r\n', mimetype='text/csv')
+        response = app.tag_export_response(response, 'abc', 'xml')
+        self.assertEqual(response.headers['ETag'], 'W/"abc"')
+
+    def test_no_etag_leaves_response_alone(self):
+        response = Response(b'a,b\r\n', mimetype='text/csv')
+        response = app.tag_export_response(response, None, 'csv')
+        self.assertNotIn('ETag', response.headers)
+        self.assertNotIn('Cache-Control', response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
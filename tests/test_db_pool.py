@@ -0,0 +1,101 @@
+"""Pooled-connection bookkeeping against a real database.
+
+Run from the repository root with DATABASE_URL pointing at a scratch
+PostgreSQL database:
+
+    python -m unittest tests.test_db_pool
+"""
+import os
+import unittest
+
+PROBE_NAME = 'test_pool_probe'
+PROBE_QUERY = 'SELECT $1::int AS n'
+
+
+@unittest.skipUnless(os.environ.get('DATABASE_URL'), 'DATABASE_URL not set')
+class PreparedStatementTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ.setdefault('RUN_DB_INIT', '0')
+        import app
+        cls.app = app
+        cls.pool = app.get_db_pool()
+        if cls.pool is None:
+            raise unittest.SkipTest('database unreachable')
+
+    def tearDown(self):
+        # Start each test from connections whose bookkeeping matches the server
+        conns = [self.app.checkout_connection(self.pool)
+                 for _ in range(self.app.DB_POOL_MIN_CONN)]
+        for conn in conns:
+            with conn.cursor() as cursor:
+                cursor.execute("DEALLOCATE ALL")
+            conn.commit()
+            conn.prepared.clear()
+        for conn in conns:
+            self.app.release_connection(self.pool, conn)
+
+    def server_prepared(self, conn):
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT name FROM pg_prepared_statements")
+            names = {row[0] for row in cursor.fetchall()}
+        conn.rollback()
+        return names
+
+    def probe(self, value=1):
+        row = self.app.execute_prepared(PROBE_NAME, PROBE_QUERY, (value,), fetch=True)
+        self.assertIsNotNone(row)
+        self.assertEqual(row['n'], value)
+
+    def test_closed_connection_is_reprepared(self):
+        self.probe()
+        conn = self.app.checkout_connection(self.pool)
+        self.app.prepare_statement(conn, PROBE_NAME, PROBE_QUERY)
+        conn.close()
+        self.app.release_connection(self.pool, conn)
+
+        # Whichever connection comes back next must PREPARE for itself
+        for _ in range(self.app.DB_POOL_MIN_CONN + 1):
+            self.probe(2)
+
+    def test_surplus_connections_do_not_leak_prepared_names(self):
+        # Checking out more than minconn makes putconn close the surplus,
+        # freeing addresses that new connections may reuse
+        conns = [self.app.checkout_connection(self.pool)
+                 for _ in range(self.app.DB_POOL_MIN_CONN + 2)]
+        for conn in conns:
+            self.app.prepare_statement(conn, PROBE_NAME, PROBE_QUERY)
+            conn.commit()
+        for conn in conns:
+            self.app.release_connection(self.pool, conn)
+        # Drop the closed ones so their addresses are free for new objects
+        del conns, conn
+
+        conns = [self.app.checkout_connection(self.pool)
+                 for _ in range(self.app.DB_POOL_MIN_CONN + 2)]
+        try:
+            for conn in conns:
+                self.assertLessEqual(conn.prepared, self.server_prepared(conn))
+        finally:
+            for conn in conns:
+                self.app.release_connection(self.pool, conn)
+        self.probe(3)
+
+    def test_statement_lost_on_server_is_reprepared(self):
+        conns = [self.app.checkout_connection(self.pool)
+                 for _ in range(self.app.DB_POOL_MIN_CONN)]
+        for conn in conns:
+            self.app.prepare_statement(conn, PROBE_NAME, PROBE_QUERY)
+            with conn.cursor() as cursor:
+                cursor.execute(f"DEALLOCATE {PROBE_NAME}")
+            conn.commit()
+        for conn in conns:
+            self.app.release_connection(self.pool, conn)
+
+        for value in range(self.app.DB_POOL_MIN_CONN + 1):
+            self.probe(value)
+
+
+if __name__ == '__main__':
+    unittest.main()
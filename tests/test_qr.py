@@ -0,0 +1,74 @@
+"""QR token signing and legacy QR text parsing; needs no database.
+
+    python -m unittest tests.test_qr
+"""
+import os
+import unittest
+
+os.environ.setdefault('RUN_DB_INIT', '0')
+import app
+
+
+class LoadQrRegistrationIdTests(unittest.TestCase):
+
+    def test_round_trip(self):
+        token = app.registration_qr_data(42)
+        self.assertEqual(app.load_qr_registration_id(token), 42)
+
+    def test_surrounding_whitespace_is_ignored(self):
+        token = app.registration_qr_data(7)
+        self.assertEqual(app.load_qr_registration_id(f"  {token}\n"), 7)
+
+    def test_tampered_id_is_rejected(self):
+        _, _, mac = app.registration_qr_data(42).partition('.')
+        self.assertIsNone(app.load_qr_registration_id(f"43.{mac}"))
+
+    def test_tampered_mac_is_rejected(self):
+        registration_id, _, mac = app.registration_qr_data(42).partition('.')
+        forged = mac[:-1] + ('A' if mac[-1] != 'A' else 'B')
+        self.assertIsNone(app.load_qr_registration_id(f"{registration_id}.{forged}"))
+
+    def test_missing_mac_is_rejected(self):
+        self.assertIsNone(app.load_qr_registration_id("42"))
+        self.assertIsNone(app.load_qr_registration_id("42."))
+
+    def test_legacy_signed_token(self):
+        token = app.qr_serializer.dumps({'rid': 42})
+        self.assertEqual(app.load_qr_registration_id(token), 42)
+
+    def test_legacy_token_with_bad_signature(self):
+        token = app.qr_serializer.dumps({'rid': 42})
+        self.assertIsNone(app.load_qr_registration_id(token[:-2] + 'xx'))
+
+    def test_garbage(self):
+        self.assertIsNone(app.load_qr_registration_id('garbage'))
+        self.assertIsNone(app.load_qr_registration_id(''))
+
+
+class ParseQrTests(unittest.TestCase):
+
+    def test_parses_key_value_lines(self):
+        qr = app.parse_qr("Event: Talk\nStudent: Ann\nStudent ID: S1")
+        self.assertEqual(qr, {'Event': 'Talk', 'Student': 'Ann', 'Student ID': 'S1'})
+
+    def test_strips_whitespace_and_carriage_returns(self):
+        qr = app.parse_qr("  Event :  Hack Night \r\nStudent ID:S2\r\n")
+        self.assertEqual(qr['Event'], 'Hack Night')
+        self.assertEqual(qr['Student ID'], 'S2')
+
+    def test_value_may_contain_colons(self):
+        qr = app.parse_qr("Event: Talk: Part 2\nStudent ID: S1")
+        self.assertEqual(qr['Event'], 'Talk: Part 2')
+
+    def test_missing_required_key(self):
+        self.assertIsNone(app.parse_qr("Event: Talk\nStudent: Ann"))
+
+    def test_empty_required_value(self):
+        self.assertIsNone(app.parse_qr("Event: \nStudent ID: S1"))
+
+    def test_not_qr_text(self):
+        self.assertIsNone(app.parse_qr("garbage"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""Chunked CSV and Arrow export writers; needs no database.
+
+    python -m unittest tests.test_streaming
+"""
+import csv
+import gzip
+import io
+import os
+import unittest
+
+os.environ.setdefault('RUN_DB_INIT', '0')
+import app
+
+
+class StreamCsvTests(unittest.TestCase):
+
+    def test_matches_csv_writer(self):
+        rows = [['Name', 'Note'], ['Ann', 'says "hi"'], ['Bob', 'a,b'], ['Céline', None]]
+        expected = io.StringIO()
+        csv.writer(expected, lineterminator='\r\n').writerows(rows)
+        self.assertEqual(b''.join(app.stream_csv(rows)), expected.getvalue().encode('utf-8'))
+
+    def test_large_output_is_chunked(self):
+        rows = [['x' * 100, i] for i in range(2000)]
+        chunks = list(app.stream_csv(rows))
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks[:-1]:
+            self.assertGreaterEqual(len(chunk), app.CSV_CHUNK_SIZE)
+        parsed = list(csv.reader(io.StringIO(b''.join(chunks).decode('utf-8'))))
+        self.assertEqual(parsed, [['x' * 100, str(i)] for i in range(2000)])
+
+    def test_no_rows_yields_nothing(self):
+        self.assertEqual(list(app.stream_csv([])), [])
+
+    def test_gzip_chunks_round_trip(self):
+        rows = [['x' * 100, i] for i in range(2000)]
+        plain = b''.join(app.stream_csv(rows))
+        self.assertEqual(gzip.decompress(b''.join(app.gzip_chunks(app.stream_csv(rows)))), plain)
+
+
+class ChunkSinkTests(unittest.TestCase):
+
+    def test_drain_returns_bytes_written_since_last_drain(self):
+        sink = app.ChunkSink()
+        self.assertEqual(sink.write(b'abc'), 3)
+        sink.write(memoryview(b'de'))
+        self.assertEqual(sink.drain(), b'abcde')
+        self.assertEqual(sink.drain(), b'')
+        sink.write(b'f')
+        self.assertEqual(sink.drain(), b'f')
+
+    def test_tell_counts_every_byte_written(self):
+        sink = app.ChunkSink()
+        sink.write(b'abc')
+        sink.drain()
+        sink.write(b'de')
+        self.assertEqual(sink.tell(), 5)
+
+    def test_close(self):
+        sink = app.ChunkSink()
+        self.assertFalse(sink.closed)
+        sink.close()
+        self.assertTrue(sink.closed)
+
+
+@unittest.skipUnless(app.PYARROW_AVAILABLE, 'pyarrow not installed')
+class StreamArrowTests(unittest.TestCase):
+
+    records = [{'name': 'Ann', 'checkin': None, 'n': i} for i in range(12)]
+
+    def test_parquet_round_trip_across_batches(self):
+        data = b''.join(app.stream_arrow(iter(self.records), 'parquet', batch_size=5))
+        table = app.pq.read_table(io.BytesIO(data))
+        self.assertEqual(table.to_pylist(), self.records)
+        self.assertEqual(str(table.schema.field('checkin').type), 'string')
+
+    def test_feather_round_trip_across_batches(self):
+        data = b''.join(app.stream_arrow(iter(self.records), 'feather', batch_size=5))
+        table = app.pa.ipc.open_file(io.BytesIO(data)).read_all()
+        self.assertEqual(table.to_pylist(), self.records)
+
+    def test_no_records_yields_nothing(self):
+        self.assertEqual(list(app.stream_arrow(iter([]), 'parquet')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()